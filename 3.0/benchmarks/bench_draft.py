@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+'''
+Measures the draft qualities of the Instagram effects. Every effect is run through the plugin against the stand-in
+gi modules at full quality and at each draft factor, recording the pixel work asked of GIMP: the samples read by
+motion blurs and the pixels of every other pass. The headless NumPy engine renders the same settings on a synthetic
+photograph, giving the error of the draft against the full quality result as the mean and largest absolute
+difference in 8 bit levels and the PSNR, and its own render times. Results are written as JSON.
+
+    python3 benchmarks/bench_draft.py [--sizes 1 4] [--factors 4 8] [--output draft.json]
+'''
+
+import os, sys, json, math, time, platform, argparse
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, here)
+
+import standin_gi
+standin_gi.Install()
+
+import numpy as np
+import instagram_engine
+import instagram_plugin
+from instagram_engine import Apply, Frame
+from instagram_curves import pluginVersion
+from standin_gi import recorder, Gimp, Config, Procedure
+
+#returns a 3:2 image size with roughly the given number of megapixels
+def ImageSize(megapixels):
+	w = int(round(math.sqrt(megapixels * 1e6 * 1.5)))
+	return w, int(round(w / 1.5))
+
+#returns an 8 bit RGB test image with smooth shading, hard edges and fine texture, so both the blur and the
+#per-pixel operations have something to work on
+def TestImage(w, h, seed=1):
+	rng = np.random.default_rng(seed)
+	ys, xs = np.mgrid[0:h, 0:w].astype(np.float32)
+	u, v = xs / w, ys / h
+
+	rgb = np.stack([0.2 + 0.6 * u, 0.3 + 0.5 * v, 0.5 + 0.3 * np.sin(6.0 * u + 4.0 * v)], axis=-1)
+	for _ in range(12):
+		cx, cy, r = rng.random(), rng.random(), 0.05 + 0.15 * rng.random()
+		inside = ((u - cx) ** 2 + ((v - cy) * h / w) ** 2) < r * r
+		rgb[inside] = rng.random(3)
+
+	rgb += rng.normal(0.0, 0.03, rgb.shape)
+	return np.rint(np.clip(rgb, 0.0, 1.0) * 255).astype(np.uint8)
+
+#returns the seconds taken by the fastest of a number of renders, and the result
+def Render(pixels, effect, frame, repeat):
+	best = math.inf
+	for _ in range(repeat):
+		start = time.perf_counter()
+		out = Apply(pixels, effect, True, frame)
+		best = min(best, time.perf_counter() - start)
+
+	return best, out
+
+#runs an effect through the plugin at a draft factor and returns the pixel work it asks GIMP for. Vignettes cached
+#by earlier runs are dropped first, so every run pays for the same ones.
+def PluginWork(plugin, effect, w, h, factor):
+	standin_gi.buffers.clear()
+	standin_gi.parasites.clear()
+
+	quality = {f: name for name, f in instagram_plugin.draftFactors.items()}[factor]
+	image = Gimp.Image(w, h)
+	drawable = Gimp.Layer(image, w, h, 'Background')
+	image.insert_layer(drawable, None, 0)
+
+	recorder.Reset(w, h)
+	config = Config({'effect': effect, 'strength': 100.0, 'output': 'LAYERS', 'quality': quality})
+	plugin.run(Procedure(), Gimp.RunMode.NONINTERACTIVE, image, [drawable], config, None)
+
+	return recorder.blurSamples + int(recorder.passes * w * h)
+
+#returns the error of a draft render against the full quality one, in 8 bit levels
+def Error(full, draft):
+	diff = np.abs(full.astype(np.float64) - draft.astype(np.float64))
+	mse = float(np.mean(diff ** 2))
+
+	return {
+		'mean_abs': round(float(diff.mean()), 4),
+		'max_abs': int(diff.max()),
+		'psnr_db': None if mse == 0 else round(10 * math.log10(255 * 255 / mse), 2)
+	}
+
+def RunBenchmarks(sizes, effects, factors, repeat=1):
+	plugin = instagram_plugin.Instagram()
+	results = {}
+	for megapixels in sizes:
+		w, h = ImageSize(megapixels)
+		pixels = TestImage(w, h)
+
+		for effect in effects:
+			instagram_engine.maskCache.clear()
+			Render(pixels, effect, Frame(w, h, 0), 1)
+			seconds, full = Render(pixels, effect, Frame(w, h, 0), repeat)
+
+			work = PluginWork(plugin, effect, w, h, 1)
+			run = {'full_seconds': round(seconds, 4), 'full_gimp_pixel_work': work}
+			for factor in factors:
+				draftSeconds, draft = Render(pixels, effect, Frame(w, h, 0, 1.0, factor), repeat)
+				draftWork = PluginWork(plugin, effect, w, h, factor)
+				run[f"draft_{factor}"] = dict(Error(full, draft), seconds=round(draftSeconds, 4),
+											  engine_speedup=round(seconds / draftSeconds, 2), gimp_pixel_work=draftWork,
+											  gimp_work_reduction=round(work / draftWork, 2))
+
+			results.setdefault(effect, {})[f"{megapixels}MP"] = run
+
+	return {
+		'version': pluginVersion,
+		'python': platform.python_version(),
+		'numpy': np.__version__,
+		'cpus': os.cpu_count(),
+		'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'effects': results
+	}
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Measure the speed and error of the draft qualities of the Instagram effects.")
+	parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4], help="image sizes in megapixels")
+	parser.add_argument("--effects", nargs="+", default=list(instagram_engine.effectFunctions), help="effect identifiers")
+	parser.add_argument("--factors", type=int, nargs="+", default=[4, 8], help="draft factors")
+	parser.add_argument("--repeat", type=int, default=1, help="renders timed for each setting, the fastest is kept")
+	parser.add_argument("--output", default=None, help="write the JSON results to this file instead of stdout")
+	args = parser.parse_args(argv)
+
+	sizes = [int(s) if s == int(s) else s for s in args.sizes]
+	results = RunBenchmarks(sizes, args.effects, args.factors, args.repeat)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=1)
+	else:
+		json.dump(results, sys.stdout, indent=1)
+		print()
+
+	#short per-effect summary at the largest size
+	largest = f"{sizes[-1]}MP"
+	for effect, runs in results['effects'].items():
+		r = runs[largest]
+		drafts = ", ".join(f"1/{f}: GIMP work /{d['gimp_work_reduction']}, engine {d['engine_speedup']}x, "
+						   f"PSNR {'n/a' if d['psnr_db'] is None else str(d['psnr_db']) + ' dB'}, max {d['max_abs']}"
+						   for f, d in ((f, r[f'draft_{f}']) for f in args.factors))
+		print(f"{effect:11} {largest}: full {r['full_seconds']:.3f} s, {drafts}", file=sys.stderr)
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+'''
+Benchmarks for the GIMP 3 Instagram plugin that run without GIMP. Every effect is run through Instagram.run against
+the stand-in gi modules at several image sizes, recording the PDB-level calls, the number of full-image pixel passes
+(including compositing the projection), the pixels kept as undo data and the peak number of full-size layers and
+masks alive. The Python-side helpers are timed as well. Results are written as JSON so runs from different
+versions can be compared.
+
+    python3 benchmarks/bench_effects.py [--sizes 1 12 24 100] [--warm] [--quality QUARTER] [--procedural-fills] [--selection 0.1] [--lightweight-undo] [--keep-looks] [--output bench.json]
+'''
+
+import os, sys, json, math, time, timeit, platform, argparse
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, here)
+
+import standin_gi
+standin_gi.Install()
+
+import instagram_plugin
+import instagram_curves
+from standin_gi import recorder, Gimp, Config, Procedure
+
+#bytes per pixel of an 8 bit RGBA layer, used to estimate the memory held by full-size buffers
+bytesPerPixel = 4
+
+#returns a 3:2 image size with roughly the given number of megapixels
+def ImageSize(megapixels):
+	w = int(round(math.sqrt(megapixels * 1e6 * 1.5)))
+	return w, int(round(w / 1.5))
+
+#runs one effect on a stand-in image and returns the recorded metrics. Unless warm, cached vignette masks
+#left by earlier runs are dropped first so every run pays for building its own. With a selection share, a
+#centered selection covering that share of the image is made and the effect is built in its bounds only.
+def RunEffect(plugin, effect, w, h, warm=False, settings=None, selection=None):
+	if not warm:
+		standin_gi.buffers.clear()
+		standin_gi.parasites.clear()
+
+	image = Gimp.Image(w, h)
+	drawable = Gimp.Layer(image, w, h, 'Background')
+	image.insert_layer(drawable, None, 0)
+	if selection is not None:
+		sw = max(1, round(w * math.sqrt(selection)))
+		sh = max(1, round(h * math.sqrt(selection)))
+		x = (w - sw) // 2
+		y = (h - sh) // 2
+		image.selection = standin_gi.Bounds(True, x, y, x + sw, y + sh)
+
+	recorder.Reset(w, h)
+	recorder.alive = 1
+	recorder.peak = 1
+
+	config = Config(dict(settings or {}, effect=effect, **{'selection-only': selection is not None}))
+	start = time.perf_counter()
+	plugin.run(Procedure(), Gimp.RunMode.NONINTERACTIVE, image, [drawable], config, None)
+	seconds = time.perf_counter() - start
+
+	#rendering the projection composites each layer, mask and filter once more
+	for layer in image.Layers():
+		recorder.Pass(layer)
+
+	result = {
+		'width': w,
+		'height': h,
+		'pdb_calls': sum(recorder.calls.values()),
+		'calls': dict(sorted(recorder.calls.items())),
+		'full_image_passes': round(recorder.passes, 3),
+		'pixels_touched': int(recorder.passes * w * h),
+		'peak_full_size_layers': recorder.peak,
+		'peak_layer_megabytes': round(recorder.peak * w * h * bytesPerPixel / 1e6, 1),
+		'final_full_size_layers': recorder.alive,
+		'undo_megabytes': round(recorder.undo * bytesPerPixel / 1e6, 1),
+		'cached_buffer_megabytes': round(sum(bw * bh * b for bw, bh, b in standin_gi.buffers.values()) / 1e6, 1),
+		'python_seconds': round(seconds, 6)
+	}
+
+	#with kept looks, running the same effect again should only show the look that is already there
+	if config.get_property('keep-looks'):
+		recorder.calls.clear()
+		recorder.passes = 0.0
+		plugin.run(Procedure(), Gimp.RunMode.NONINTERACTIVE, image, [drawable], config, None)
+		for layer in image.Layers():
+			recorder.Pass(layer)
+		result['repeat_pdb_calls'] = sum(recorder.calls.values())
+		result['repeat_full_image_passes'] = round(recorder.passes, 3)
+
+	return result
+
+#times the Python-side helpers that run on every invocation
+def TimeHelpers(number=200):
+	def luts():
+		instagram_curves.FastSRGBLuts.cache_clear()
+		instagram_curves.FastSRGBLuts()
+
+	def options():
+		instagram_plugin.CreateOptions('Vignettes', [('STANDARD', 'Fits inside the image'), ('LARGE', 'Extends outside the image'),
+												  ('OBLATE', 'Flattened'), ('NONE', 'Defaults to an empty layer')])
+
+	def chain():
+		c = instagram_curves.CurveChain()
+		c.SRGBSpline(instagram_curves.VALUE, [12/255, 0, 1.0, 1.0])
+		c.SRGBSpline(instagram_curves.RED, [10/255, 0, 247/255, 1.0])
+		c.SRGBSpline(instagram_curves.BLUE, [0, 38/255, 1.0, 203/255])
+		c.Levels(instagram_curves.VALUE, 0, 235/255, True, 1.17, 55/255, 1.0, True)
+		c.SRGBSpline(instagram_curves.VALUE, [41/255, 0, 125/255, 124/255, 1.0, 1.0])
+		c.Compile()
+
+	results = {}
+	for name, fn, count in (('FastSRGBLuts', luts, number), ('CreateOptions', options, number), ('CurveChain.Compile', chain, max(1, number // 20))):
+		results[name] = round(min(timeit.repeat(fn, number=count, repeat=3)) / count * 1e6, 2)
+
+	return {'microseconds_per_call': results}
+
+def RunBenchmarks(sizes, effects, warm=False, settings=None, selection=None):
+	plugin = instagram_plugin.Instagram()
+	results = {}
+	for effect in effects:
+		results[effect] = {}
+		for megapixels in sizes:
+			w, h = ImageSize(megapixels)
+			results[effect][f"{megapixels}MP"] = RunEffect(plugin, effect, w, h, warm, settings, selection)
+
+	return {
+		'version': instagram_curves.pluginVersion,
+		'python': platform.python_version(),
+		'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'warm_cache': warm,
+		'settings': settings or {},
+		'selection_share': selection,
+		'effects': results,
+		'helpers': TimeHelpers()
+	}
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark the Instagram effects against a stand-in GIMP API.")
+	parser.add_argument("--sizes", type=float, nargs="+", default=[1, 12, 24, 100], help="image sizes in megapixels")
+	parser.add_argument("--effects", nargs="+", default=[e for e, _ in instagram_plugin.effectsList], help="effect identifiers")
+	parser.add_argument("--warm", action="store_true", help="keep cached vignette masks between runs, as in one GIMP session")
+	parser.add_argument("--quality", default="FULL", choices=list(instagram_plugin.draftFactors), help="quality option of the effects")
+	parser.add_argument("--procedural-fills", action="store_true", help="run the effects with procedural color fills")
+	parser.add_argument("--selection", type=float, default=None, help="select this share of the image and only process its bounds")
+	parser.add_argument("--lightweight-undo", action="store_true", help="build the effects without undo and add the group as one step")
+	parser.add_argument("--keep-looks", action="store_true", help="keep looks and also time running each effect again")
+	parser.add_argument("--output", default=None, help="write the JSON results to this file instead of stdout")
+	args = parser.parse_args(argv)
+
+	sizes = [int(s) if s == int(s) else s for s in args.sizes]
+	results = RunBenchmarks(sizes, args.effects, args.warm, {'strength': 100.0, 'quality': args.quality, 'procedural-fills': args.procedural_fills,
+							  'lightweight-undo': args.lightweight_undo, 'keep-looks': args.keep_looks}, args.selection)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=1)
+	else:
+		json.dump(results, sys.stdout, indent=1)
+		print()
+
+	#short per-effect summary at the largest size
+	largest = f"{sizes[-1]}MP"
+	for effect, runs in results['effects'].items():
+		r = runs[largest]
+		print(f"{effect:11} {largest}: {r['pdb_calls']:4} calls, {r['full_image_passes']:6.2f} passes, "
+			  f"peak {r['peak_full_size_layers']} layers ({r['peak_layer_megabytes']} MB), "
+			  f"undo {r['undo_megabytes']} MB, {r['python_seconds'] * 1e3:.1f} ms", file=sys.stderr)
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+'''
+Scaling curve of the multi-core strip executor of the headless NumPy engine. Each effect is rendered once with
+Apply, which takes one pass over the whole image per operation, and then with ApplyParallel at each worker count,
+which runs the whole chain one cache sized strip at a time on a pool of threads. The time, speedup over one worker
+and parallel efficiency are recorded for each count, together with the number of cores the machine has, since
+counts above it can only show the overhead of the extra threads. Results are written as JSON.
+
+    python3 benchmarks/bench_parallel.py [--size 2] [--workers 1 2 4 8 16 32] [--effects WALDEN TOASTER GOTHAM] [--output parallel.json]
+'''
+
+import os, sys, json, math, time, platform, argparse
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+
+import numpy as np
+import instagram_engine
+from instagram_engine import Apply, ApplyParallel
+from instagram_curves import pluginVersion
+
+#returns a 3:2 image size with roughly the given number of megapixels
+def ImageSize(megapixels):
+	w = int(round(math.sqrt(megapixels * 1e6 * 1.5)))
+	return w, int(round(w / 1.5))
+
+def Seconds(fn, repeat):
+	best = math.inf
+	for _ in range(repeat):
+		start = time.perf_counter()
+		fn()
+		best = min(best, time.perf_counter() - start)
+
+	return best
+
+def RunBenchmarks(megapixels, effects, workerCounts, repeat=1):
+	w, h = ImageSize(megapixels)
+	pixels = (np.random.default_rng(1).random((h, w, 3)) * 255).astype(np.uint8)
+
+	results = {}
+	for effect in effects:
+		Apply(pixels, effect)
+		run = {'apply_seconds': round(Seconds(lambda: Apply(pixels, effect), repeat), 4), 'workers': {}}
+
+		single = None
+		for workers in workerCounts:
+			seconds = Seconds(lambda: ApplyParallel(pixels, effect, workers=workers), repeat)
+			single = seconds if single is None else single
+			run['workers'][str(workers)] = {
+				'seconds': round(seconds, 4),
+				'speedup': round(single / seconds, 2),
+				'efficiency': round(single / seconds / workers, 2)
+			}
+
+		results[effect] = run
+
+	return {
+		'version': pluginVersion,
+		'python': platform.python_version(),
+		'numpy': np.__version__,
+		'cpus': os.cpu_count(),
+		'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'width': w,
+		'height': h,
+		'strip_rows': instagram_engine.StripRows(w),
+		'effects': results
+	}
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Measure how the strip executor of the engine scales with worker threads.")
+	parser.add_argument("--size", type=float, default=2, help="image size in megapixels")
+	parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="worker counts, starting with 1")
+	parser.add_argument("--effects", nargs="+", default=["WALDEN", "TOASTER", "GOTHAM"], help="effect identifiers")
+	parser.add_argument("--repeat", type=int, default=1, help="renders timed for each setting, the fastest is kept")
+	parser.add_argument("--output", default=None, help="write the JSON results to this file instead of stdout")
+	args = parser.parse_args(argv)
+
+	results = RunBenchmarks(args.size, args.effects, args.workers, args.repeat)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=1)
+	else:
+		json.dump(results, sys.stdout, indent=1)
+		print()
+
+	print(f"{results['cpus']} cores, {results['width']}x{results['height']}, {results['strip_rows']} rows per strip", file=sys.stderr)
+	for effect, r in results['effects'].items():
+		curve = ", ".join(f"{n}: {c['speedup']}x" for n, c in r['workers'].items())
+		print(f"{effect:11} whole image passes {r['apply_seconds']:.3f} s, strips {curve}", file=sys.stderr)
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
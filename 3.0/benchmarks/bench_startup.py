@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+'''
+Startup benchmark for the GIMP 3 Instagram plugin. GIMP starts the plugin at every launch to query it: it runs
+gimp_instagram.py as a script, creates the plugin object, calls do_query_procedures and creates each procedure. Each
+run does that in a fresh interpreter against the stand-in gi modules, with bytecode caching on as in GIMP and after
+one run that fills the cache, and records the time to load the script and to query, the whole process time, the gi
+libraries the plugin asked for, how often GEGL was initialized and the modules it loaded. The stand-ins load no
+typelibs, so the times cover the plugin's own Python work, while the libraries asked for show what a real GIMP would
+load on top. Results are written as JSON.
+
+    python3 benchmarks/bench_startup.py [--runs 20] [--output startup.json]
+'''
+
+import os, sys, json, time, statistics, platform, subprocess, argparse
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+#runs in a fresh interpreter: starts the plugin script and runs the query path, then prints the measurements. Only
+#modules the interpreter loads anyway are imported before the measurements, so the plugin pays for its own imports.
+childCode = """
+import os, sys, time
+here = sys.argv[1]
+sys.path.insert(0, os.path.dirname(here))
+sys.path.insert(0, here)
+
+import standin_gi
+standin_gi.Install()
+from standin_gi import recorder
+
+required = []
+sys.modules['gi'].require_version = lambda name, version: required.append(name)
+before = set(sys.modules)
+
+#scripts are compiled from source on every start, as the interpreter does for the file it is given
+path = os.path.join(os.path.dirname(here), 'gimp_instagram.py')
+script = {'__name__': '__main__', '__file__': path}
+start = time.perf_counter()
+with open(path) as f:
+	exec(compile(f.read(), path, 'exec'), script)
+loaded = time.perf_counter()
+
+plugin = script['Instagram']()
+for name in plugin.do_query_procedures():
+	plugin.do_create_procedure(name)
+queried = time.perf_counter()
+
+modules = sorted(m for m in set(sys.modules) - before if not m.startswith('gi'))
+import json
+json.dump({
+	'load_ms': (loaded - start) * 1000,
+	'query_ms': (queried - loaded) * 1000,
+	'required': required,
+	'gegl_inits': recorder.calls.get('init', 0),
+	'modules': modules
+}, sys.stdout)
+"""
+
+#starts one child interpreter and returns its measurements with the whole process time
+def Run():
+	env = {k: v for k, v in os.environ.items() if k != 'PYTHONDONTWRITEBYTECODE'}
+	start = time.perf_counter()
+	output = subprocess.run([sys.executable, '-c', childCode, here], check=True,
+							capture_output=True, text=True, env=env).stdout
+	result = json.loads(output)
+	result['process_ms'] = (time.perf_counter() - start) * 1000
+
+	return result
+
+def RunBenchmarks(runs):
+	Run()
+	results = [Run() for _ in range(runs)]
+	last = results[-1]
+
+	return {
+		'python': platform.python_version(),
+		'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'runs': runs,
+		'load_ms': round(statistics.median(r['load_ms'] for r in results), 2),
+		'query_ms': round(statistics.median(r['query_ms'] for r in results), 2),
+		'process_ms': round(statistics.median(r['process_ms'] for r in results), 1),
+		'required': last['required'],
+		'gegl_inits': last['gegl_inits'],
+		'modules': last['modules']
+	}
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Measure the import and query path GIMP runs at every launch.")
+	parser.add_argument("--runs", type=int, default=20, help="fresh interpreters started, the median is kept")
+	parser.add_argument("--output", default=None, help="write the JSON results to this file instead of stdout")
+	args = parser.parse_args(argv)
+
+	results = RunBenchmarks(args.runs)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=1)
+	else:
+		json.dump(results, sys.stdout, indent=1)
+		print()
+
+	print(f"load {results['load_ms']} ms, query {results['query_ms']} ms, process {results['process_ms']} ms, "
+		  f"requires {', '.join(results['required'])}, {results['gegl_inits']} GEGL inits, {len(results['modules'])} modules",
+		  file=sys.stderr)
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+'''
+Measures the peak memory of streaming the Instagram effects through instagram_stream.py against rendering the
+whole image at once with the headless engine. A raw test image is written for each size, and each render runs in
+a fresh process that reports its peak resident memory and time. Whole image renders are skipped above --whole-limit
+megapixels, where they would not fit in memory. Results are written as JSON.
+
+    python3 benchmarks/bench_stream.py [--sizes 4 16 64] [--effects LORDKELVIN TOASTER GOTHAM] [--rows 256] [--output stream.json]
+'''
+
+import os, sys, json, math, time, tempfile, resource, platform, argparse
+import multiprocessing
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+
+import numpy as np
+import instagram_engine, instagram_stream
+from instagram_curves import pluginVersion
+
+#returns a 3:2 image size with roughly the given number of megapixels
+def ImageSize(megapixels):
+	w = int(round(math.sqrt(megapixels * 1e6 * 1.5)))
+	return w, int(round(w / 1.5))
+
+#writes a raw RGB test image one band of rows at a time, so making it needs little memory
+def WriteTestImage(path, w, h, rows=256):
+	image = np.memmap(path, dtype=np.uint8, mode='w+', shape=(h, w, 3))
+	xs = np.arange(w, dtype=np.float32) / w
+	for y0 in range(0, h, rows):
+		ys = np.arange(y0, min(h, y0 + rows), dtype=np.float32)[:, None] / h
+		band = np.stack([xs + 0 * ys, ys + 0 * xs, 0.5 + 0.5 * np.sin(40 * xs + 30 * ys)], axis=-1)
+		image[y0:y0 + len(band)] = np.rint(band * 255).astype(np.uint8)
+
+	image.flush()
+	del image
+
+#runs in a fresh process and reports the peak resident memory in MB and the seconds taken
+def Measure(queue, mode, path, outpath, shape, effect, rows):
+	start = time.perf_counter()
+	if mode == 'stream':
+		instagram_stream.StreamFile(path, outpath, effect, rows, shape)
+	else:
+		pixels = np.fromfile(path, np.uint8).reshape(shape)
+		instagram_engine.Apply(pixels, effect).tofile(outpath)
+
+	seconds = time.perf_counter() - start
+	queue.put((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, seconds))
+
+def Run(mode, path, outpath, shape, effect, rows):
+	context = multiprocessing.get_context('spawn')
+	queue = context.Queue()
+	process = context.Process(target=Measure, args=(queue, mode, path, outpath, shape, effect, rows))
+	process.start()
+	peak, seconds = queue.get()
+	process.join()
+
+	return {'peak_megabytes': round(peak, 1), 'seconds': round(seconds, 3)}
+
+def RunBenchmarks(sizes, effects, rows=instagram_stream.streamRows, wholeLimit=16, workdir=None):
+	workdir = workdir or tempfile.mkdtemp(prefix='instagram-stream-')
+	results = {}
+	for megapixels in sizes:
+		w, h = ImageSize(megapixels)
+		shape = (h, w, 3)
+		path = os.path.join(workdir, 'source.raw')
+		outpath = os.path.join(workdir, 'output.raw')
+		WriteTestImage(path, w, h)
+
+		for effect in effects:
+			run = {'file_megabytes': round(w * h * 3 / 1e6, 1),
+				   'stream': Run('stream', path, outpath, shape, effect, rows)}
+			if megapixels <= wholeLimit:
+				run['whole'] = Run('whole', path, outpath, shape, effect, rows)
+
+			results.setdefault(effect, {})[f"{megapixels}MP"] = run
+
+		os.remove(path)
+		os.remove(outpath)
+
+	return {
+		'version': pluginVersion,
+		'python': platform.python_version(),
+		'numpy': np.__version__,
+		'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'strip_rows': rows,
+		'effects': results
+	}
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Compare the peak memory of streaming and whole image renders.")
+	parser.add_argument("--sizes", type=float, nargs="+", default=[4, 16, 64], help="image sizes in megapixels")
+	parser.add_argument("--effects", nargs="+", default=["LORDKELVIN", "TOASTER", "GOTHAM"], help="effect identifiers")
+	parser.add_argument("--rows", type=int, default=instagram_stream.streamRows, help="strip height in rows")
+	parser.add_argument("--whole-limit", type=float, default=16, help="largest size in megapixels rendered whole")
+	parser.add_argument("--output", default=None, help="write the JSON results to this file instead of stdout")
+	args = parser.parse_args(argv)
+
+	sizes = [int(s) if s == int(s) else s for s in args.sizes]
+	results = RunBenchmarks(sizes, args.effects, args.rows, args.whole_limit)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=1)
+	else:
+		json.dump(results, sys.stdout, indent=1)
+		print()
+
+	for effect, runs in results['effects'].items():
+		for size, r in runs.items():
+			whole = r.get('whole')
+			whole = f", whole {whole['peak_megabytes']} MB in {whole['seconds']} s" if whole else ""
+			print(f"{effect:11} {size:>6}: stream {r['stream']['peak_megabytes']} MB in {r['stream']['seconds']} s{whole}",
+				  file=sys.stderr)
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,639 @@
+#!/usr/bin/env python3
+
+'''
+A stand-in for the gi modules used by the GIMP 3 Instagram plugin, so the plugin can be imported and its run method
+executed without GIMP. No pixels are held. Instead every call is counted, every per-pixel operation adds the share
+of the image it touches to a count of full-image passes, and the number of full-size layers and masks alive is
+tracked together with its peak. Pixels kept as undo data by images with undo enabled are counted too. Call
+Install() before importing instagram_plugin.
+'''
+
+import sys, math, types, itertools
+from enum import IntEnum
+from collections import Counter, namedtuple
+
+#methods that read and write every pixel of the drawable they are called on
+passMethods = ('levels', 'curves_explicit', 'curves_spline', 'hue_saturation', 'brightness_contrast', 'desaturate',
+			   'edit_fill', 'fill', 'edit_gradient_fill', 'append_filter', 'merge_filters', 'select_ellipse')
+
+#
+# --- Recording ---
+#
+
+class Recorder:
+	def __init__(self):
+		self.Reset(1, 1)
+
+	def Reset(self, w, h):
+		self.w = w
+		self.h = h
+		self.calls = Counter()
+		self.passes = 0.0
+		self.undo = 0
+		self.alive = 0
+		self.peak = 0
+		self.gradients = []
+		self.blurSamples = 0
+
+	def Call(self, name):
+		self.calls[name] += 1
+
+	#adds the share of the image covered by a drawable to the pass count
+	def Pass(self, item, weight=1.0):
+		self.passes += weight * (item.w * item.h) / (self.w * self.h)
+
+	#adds the pixels of a drawable to the undo data, when its image keeps undo
+	def Undo(self, item, image=None):
+		image = image or item.image
+		if image is not None and image.undoEnabled:
+			self.undo += item.w * item.h
+
+	#adds the samples a linear motion blur reads, length + 1 for each pixel of the drawable as GEGL takes them
+	def Blur(self, item, length):
+		self.blurSamples += item.w * item.h * (math.ceil(length) + 1)
+
+	#counts full-size buffers as they are created and released
+	def Alive(self, item, delta):
+		if item.w * item.h >= self.w * self.h:
+			self.alive += delta
+			self.peak = max(self.peak, self.alive)
+
+recorder = Recorder()
+
+#returns a function that only records that it was called
+def Recorded(name):
+	def call(*args, **kwargs):
+		recorder.Call(name)
+
+	return call
+
+#
+# --- Enums ---
+#
+
+def Enum(name, members):
+	return IntEnum(name, members)
+
+HistogramChannel = Enum('HistogramChannel', {'VALUE': 0, 'RED': 1, 'GREEN': 2, 'BLUE': 3, 'ALPHA': 4})
+LayerMode = Enum('LayerMode', {'OVERLAY': 23, 'NORMAL': 28, 'MULTIPLY': 30, 'SCREEN': 31, 'DODGE': 42,
+							   'HARDLIGHT': 44, 'SOFTLIGHT': 45, 'REPLACE': 61})
+MergeType = Enum('MergeType', {'EXPAND_AS_NECESSARY': 0, 'CLIP_TO_IMAGE': 1, 'CLIP_TO_BOTTOM_LAYER': 2, 'FLATTEN_IMAGE': 3})
+FillType = Enum('FillType', {'FOREGROUND': 0, 'BACKGROUND': 1, 'CIRCLE': 2, 'WHITE': 3, 'TRANSPARENT': 4, 'PATTERN': 5})
+ImageType = Enum('ImageType', {'RGB_IMAGE': 0, 'RGBA_IMAGE': 1})
+ImageBaseType = Enum('ImageBaseType', {'RGB': 0, 'GRAY': 1, 'INDEXED': 2})
+DesaturateMode = Enum('DesaturateMode', {'LIGHTNESS': 0, 'LUMINANCE': 1, 'AVERAGE': 2, 'LUMINOSITY': 3, 'VALUE': 4})
+HueRange = Enum('HueRange', {'ALL': 0})
+GradientType = Enum('GradientType', {'LINEAR': 0, 'BILINEAR': 1, 'RADIAL': 2})
+ChannelOps = Enum('ChannelOps', {'ADD': 0, 'SUBTRACT': 1, 'REPLACE': 2, 'INTERSECT': 3})
+AddMaskType = Enum('AddMaskType', {'WHITE': 0, 'BLACK': 1, 'ALPHA': 2, 'ALPHA_TRANSFER': 3, 'SELECTION': 4, 'COPY': 5, 'CHANNEL': 6})
+InterpolationType = Enum('InterpolationType', {'NONE': 0, 'LINEAR': 1, 'CUBIC': 2, 'NOHALO': 3, 'LOHALO': 4})
+GradientBlendColorSpace = Enum('GradientBlendColorSpace', {'RGB_PERCEPTUAL': 0, 'RGB_LINEAR': 1, 'CIE_LAB': 2})
+PDBStatusType = Enum('PDBStatusType', {'EXECUTION_ERROR': 0, 'CALLING_ERROR': 1, 'PASS_THROUGH': 2, 'SUCCESS': 3, 'CANCEL': 4})
+RunMode = Enum('RunMode', {'INTERACTIVE': 0, 'NONINTERACTIVE': 1, 'WITH_LAST_VALS': 2})
+PDBProcType = Enum('PDBProcType', {'INTERNAL': 0, 'PLUGIN': 1, 'PERSISTENT': 2, 'TEMPORARY': 3})
+ParamFlags = Enum('ParamFlags', {'READABLE': 1, 'WRITABLE': 2, 'READWRITE': 3})
+
+#
+# --- Items ---
+#
+
+#ids handed out to items, like gimp_item_get_id
+itemIds = itertools.count(1)
+
+class Item:
+	def __init__(self, image, w, h, name=''):
+		self.image = image
+		self.w = int(w)
+		self.h = int(h)
+		self.name = name
+		self.x = 0
+		self.y = 0
+		self.parent = None
+		self.mask = None
+		self.id = next(itemIds)
+		self.parasites = {}
+		self.visible = True
+		self.revision = 0
+		self.filters = []
+
+	#any method not defined here only records the call, and counts a pass if it touches every pixel
+	def __getattr__(self, name):
+		if name.startswith('__'):
+			raise AttributeError(name)
+
+		def call(*args, **kwargs):
+			if name in passMethods:
+				self.Touch(name)
+			else:
+				recorder.Call(name)
+
+		return call
+
+	#records a call that reads and writes every pixel of the item
+	def Touch(self, name):
+		recorder.Call(name)
+		self.revision += 1
+		recorder.Pass(self)
+		recorder.Undo(self)
+
+	#a filter added to a drawable is undone by reference, so it keeps no pixels as undo data until it is merged
+	def append_filter(self, filter):
+		recorder.Call('append_filter')
+		self.revision += 1
+		recorder.Pass(self)
+		self.filters.append(filter)
+		if filter.operation == 'gegl:motion-blur-linear':
+			recorder.Blur(self, filter.config.get_property('length'))
+
+	def get_filters(self):
+		recorder.Call('get_filters')
+		return list(self.filters)
+
+	def merge_filters(self):
+		self.Touch('merge_filters')
+		self.filters = []
+
+	#the endpoints of each gradient are recorded with the offsets of the drawable they are relative to
+	def edit_gradient_fill(self, type, offset, supersample, depth, threshold, dither, x1, y1, x2, y2):
+		self.Touch('edit_gradient_fill')
+		recorder.gradients.append((self.name, self.x, self.y, x1, y1, x2, y2))
+
+	def get_width(self):
+		recorder.Call('get_width')
+		return self.w
+
+	def get_height(self):
+		recorder.Call('get_height')
+		return self.h
+
+	def get_id(self):
+		return self.id
+
+	def get_name(self):
+		return self.name
+
+	def get_offsets(self):
+		recorder.Call('get_offsets')
+		return True, self.x, self.y
+
+	def set_offsets(self, x, y):
+		recorder.Call('set_offsets')
+		self.x = x
+		self.y = y
+
+	def get_visible(self):
+		recorder.Call('get_visible')
+		return self.visible
+
+	def set_visible(self, visible):
+		recorder.Call('set_visible')
+		self.visible = visible
+
+	def is_group(self):
+		return isinstance(self, GroupLayer)
+
+	def get_mask(self):
+		recorder.Call('get_mask')
+		return self.mask
+
+	#previews are rendered by GIMP, so only the call is counted. Their data changes with the pixels of the item.
+	def get_thumbnail_data(self, w, h):
+		recorder.Call('get_thumbnail_data')
+		return Bytes(f"{self.id}:{self.revision}".encode()), w, h, 4
+
+	def get_parasite(self, name):
+		recorder.Call('get_parasite')
+		return self.parasites.get(name)
+
+	def attach_parasite(self, parasite):
+		recorder.Call('attach_parasite')
+		self.parasites[parasite.name] = parasite
+
+class Channel(Item):
+	pass
+
+class Layer(Item):
+	def create_mask(self, fill):
+		recorder.Call('create_mask')
+		mask = Channel(self.image, self.w, self.h, 'mask')
+		recorder.Pass(mask)
+		return mask
+
+	def add_mask(self, mask):
+		recorder.Call('add_mask')
+		self.mask = mask
+		recorder.Alive(mask, 1)
+
+	#resizing copies the part of the layer that is kept into a new buffer
+	def resize(self, w, h, offsetX, offsetY):
+		recorder.Call('layer_resize')
+		recorder.Alive(self, -1)
+		self.w = int(w)
+		self.h = int(h)
+		self.x -= offsetX
+		self.y -= offsetY
+		recorder.Alive(self, 1)
+		recorder.Pass(self)
+
+	def scale(self, w, h, localOrigin):
+		recorder.Call('layer_scale')
+		recorder.Alive(self, -1)
+		self.w = int(w)
+		self.h = int(h)
+		recorder.Alive(self, 1)
+		recorder.Pass(self)
+
+	@classmethod
+	def new(cls, image, name, w, h, type, opacity, mode):
+		recorder.Call('layer_new')
+		return cls(image, w, h, name)
+
+	@classmethod
+	def new_from_visible(cls, image, dest, name):
+		recorder.Call('new_from_visible')
+		layer = cls(dest, image.w, image.h, name)
+		recorder.Pass(layer)
+		return layer
+
+	#copying a layer copies its mask and filters too
+	@classmethod
+	def new_from_drawable(cls, drawable, image):
+		recorder.Call('new_from_drawable')
+		return drawable.Copy(image)
+
+	def Copy(self, image):
+		layer = Layer(image, self.w, self.h, self.name)
+		layer.x, layer.y = self.x, self.y
+		layer.filters = list(self.filters)
+		recorder.Pass(layer)
+		if self.mask is not None:
+			layer.mask = Channel(image, self.mask.w, self.mask.h, 'mask')
+			recorder.Pass(layer.mask)
+			recorder.Alive(layer.mask, 1)
+
+		return layer
+
+class GroupLayer(Layer):
+	def __init__(self, image, w, h, name=''):
+		super().__init__(image, w, h, name)
+		self.children = []
+
+	@classmethod
+	def new(cls, image, name=''):
+		recorder.Call('group_new')
+		return cls(image, image.w, image.h, name)
+
+	def get_children(self):
+		recorder.Call('get_children')
+		return list(self.children)
+
+class Image(Item):
+	def __init__(self, w, h):
+		super().__init__(None, w, h, 'image')
+		self.children = []
+		self.selected = []
+		self.selection = None
+		self.undoEnabled = True
+
+	def insert_layer(self, layer, parent, position):
+		recorder.Call('insert_layer')
+		layer.parent = parent or self
+		layer.parent.children.insert(position, layer)
+		if not isinstance(layer, GroupLayer):
+			recorder.Alive(layer, 1)
+
+	def get_layers(self):
+		recorder.Call('get_layers')
+		return list(self.children)
+
+	def get_channels(self):
+		recorder.Call('get_channels')
+		return []
+
+	#removing a layer releases it and everything inside it
+	def remove_layer(self, layer):
+		recorder.Call('remove_layer')
+		layer.parent.children.remove(layer)
+		for item in self.Layers([layer]):
+			if not isinstance(item, GroupLayer):
+				recorder.Alive(item, -1)
+			if item.mask is not None:
+				recorder.Alive(item.mask, -1)
+
+	#merges a layer into the one below it, which reads both and writes one full buffer. Undo keeps both layers.
+	def merge_down(self, layer, type):
+		recorder.Call('merge_down')
+		siblings = layer.parent.children
+		below = siblings[siblings.index(layer) + 1]
+		siblings.remove(layer)
+		recorder.Pass(below)
+		recorder.Undo(layer)
+		recorder.Undo(below)
+		recorder.Alive(layer, -1)
+		return below
+
+	@classmethod
+	def new(cls, w, h, type):
+		recorder.Call('image_new')
+		return cls(w, h)
+
+	@classmethod
+	def new_with_precision(cls, w, h, type, precision):
+		recorder.Call('image_new')
+		return cls(w, h)
+
+	#8 bit non-linear, the precision of images opened from JPEG or PNG
+	def get_precision(self):
+		recorder.Call('get_precision')
+		return 150
+
+	def undo_disable(self):
+		recorder.Call('undo_disable')
+		self.undoEnabled = False
+
+	def undo_enable(self):
+		recorder.Call('undo_enable')
+		self.undoEnabled = True
+
+	def delete(self):
+		recorder.Call('image_delete')
+		for layer in self.Layers():
+			if not isinstance(layer, GroupLayer):
+				recorder.Alive(layer, -1)
+
+	#selecting a channel copies it to the selection mask
+	def select_item(self, operation, item):
+		recorder.Call('select_item')
+		recorder.Pass(self)
+
+	def remove_channel(self, channel):
+		recorder.Call('remove_channel')
+
+	def get_selected_drawables(self):
+		return self.selected
+
+	def set_selected_layers(self, layers):
+		recorder.Call('set_selected_layers')
+		self.selected = [l for l in layers if l is not None]
+
+	#every layer left in the image is composited once when the projection is rendered
+	def Layers(self, items=None):
+		for item in self.children if items is None else items:
+			yield item
+			if isinstance(item, GroupLayer):
+				yield from self.Layers(item.children)
+
+#
+# --- Selection, filters, choices and procedures ---
+#
+
+Bounds = namedtuple('Bounds', ['non_empty', 'x1', 'y1', 'x2', 'y2'])
+
+class Selection:
+	#an image holds the bounds of its selection, or None when nothing is selected
+	@staticmethod
+	def bounds(image):
+		recorder.Call('selection_bounds')
+		return image.selection or Bounds(True, 0, 0, image.w, image.h)
+
+	@staticmethod
+	def is_empty(image):
+		recorder.Call('selection_is_empty')
+		return image.selection is None
+
+	#saving the selection copies its mask to a new channel
+	@staticmethod
+	def save(image):
+		recorder.Call('selection_save')
+		recorder.Pass(image)
+		return Channel(image, image.w, image.h, 'selection')
+
+	#feathering blurs the whole selection mask
+	@staticmethod
+	def feather(image, radius):
+		recorder.Call('selection_feather')
+		recorder.Pass(image)
+		recorder.Undo(image, image)
+
+	@staticmethod
+	def invert(image):
+		recorder.Call('selection_invert')
+		recorder.Pass(image)
+		recorder.Undo(image, image)
+
+	all = staticmethod(Recorded('selection_all'))
+	none = staticmethod(Recorded('selection_none'))
+
+#named buffers and global parasites outlive a run, like they do in a GIMP session
+buffers = {}
+parasites = {}
+
+def edit_named_copy(drawables, name):
+	recorder.Call('edit_named_copy')
+	drawable = drawables[0]
+	recorder.Pass(drawable)
+	buffers[name] = (drawable.w, drawable.h, 4)
+	return name
+
+#pasting creates a floating selection the size of the buffer
+def edit_named_paste(drawable, name, pasteInto):
+	recorder.Call('edit_named_paste')
+	w, h, _ = buffers[name]
+	floating = Layer(drawable.image, w, h, name)
+	recorder.Pass(floating)
+	return floating
+
+#anchoring keeps the pixels it replaces as undo data
+def floating_sel_anchor(floating):
+	recorder.Call('floating_sel_anchor')
+	recorder.Pass(floating)
+	recorder.Undo(floating)
+	recorder.Alive(floating, -1)
+
+def buffers_get_name_list(filter):
+	recorder.Call('buffers_get_name_list')
+	return [name for name in buffers if filter in name]
+
+def buffer_delete(name):
+	recorder.Call('buffer_delete')
+	del buffers[name]
+
+#data handed back by GIMP as GLib.Bytes
+class Bytes:
+	def __init__(self, data):
+		self.data = data
+
+	def get_data(self):
+		return self.data
+
+class Parasite:
+	def __init__(self, name, flags, data):
+		self.name = name
+		self.data = data
+
+	@classmethod
+	def new(cls, name, flags, data):
+		return cls(name, flags, data)
+
+	def get_data(self):
+		return self.data
+
+def attach_parasite(parasite):
+	recorder.Call('attach_parasite')
+	parasites[parasite.name] = parasite
+
+def get_parasite(name):
+	recorder.Call('get_parasite')
+	return parasites.get(name)
+
+def detach_parasite(name):
+	recorder.Call('detach_parasite')
+	return parasites.pop(name, None) is not None
+
+#the description of a property, of which only the name is used
+ParamSpec = namedtuple('ParamSpec', ['name'])
+
+class Config:
+	def __init__(self, values=None):
+		self.values = dict(values or {})
+
+	def list_properties(self):
+		return [ParamSpec(name) for name in self.values]
+
+	def get_property(self, name):
+		return self.values.get(name)
+
+	def set_property(self, name, value):
+		recorder.Call('config_set_property')
+		self.values[name] = value
+
+class DrawableFilter:
+	def __init__(self, layer, operation, name):
+		self.layer = layer
+		self.operation = operation
+		self.name = name
+		self.mode = None
+		self.opacity = 1.0
+		self.config = Config()
+
+	@classmethod
+	def new(cls, layer, operation, name):
+		recorder.Call('filter_new')
+		return cls(layer, operation, name)
+
+	def get_config(self):
+		return self.config
+
+	def get_operation_name(self):
+		return self.operation
+
+	def get_name(self):
+		return self.name
+
+	def get_blend_mode(self):
+		return self.mode
+
+	def set_blend_mode(self, mode):
+		recorder.Call('filter_set_blend_mode')
+		self.mode = mode
+
+	def get_opacity(self):
+		return self.opacity
+
+	def set_opacity(self, opacity):
+		recorder.Call('filter_set_opacity')
+		self.opacity = opacity
+
+	def __getattr__(self, name):
+		if name.startswith('__'):
+			raise AttributeError(name)
+		return Recorded('filter_' + name)
+
+class Choice:
+	def __init__(self):
+		self.labels = {}
+
+	@classmethod
+	def new(cls):
+		return cls()
+
+	def add(self, identifier, index, label, description):
+		self.labels[identifier] = label
+
+	def get_label(self, identifier):
+		return self.labels[identifier]
+
+class Procedure:
+	def new_return_values(self, status, error):
+		return (status, error)
+
+#a procedure being created, whose documentation and arguments are only recorded
+class ImageProcedure:
+	@classmethod
+	def new(cls, *args):
+		recorder.Call('procedure_new')
+		return cls()
+
+	def __getattr__(self, name):
+		if name.startswith('__'):
+			raise AttributeError(name)
+		return Recorded('procedure_' + name)
+
+class PlugIn:
+	__gtype__ = None
+
+class Color:
+	@classmethod
+	def new(cls, name):
+		return cls()
+
+	def set_rgba(self, r, g, b, a):
+		self.rgba = (r, g, b, a)
+
+#
+# --- Modules ---
+#
+
+#a module whose unknown attributes are recorded no-op functions, such as Gimp.context_set_opacity
+class Module(types.ModuleType):
+	def __getattr__(self, name):
+		if name.startswith('__'):
+			raise AttributeError(name)
+		return Recorded(name)
+
+def MakeModule(name, **attributes):
+	module = Module(name)
+	for key, value in attributes.items():
+		setattr(module, key, value)
+
+	return module
+
+Gimp = MakeModule('gi.repository.Gimp',
+	HistogramChannel=HistogramChannel, LayerMode=LayerMode, MergeType=MergeType, FillType=FillType,
+	ImageType=ImageType, ImageBaseType=ImageBaseType, DesaturateMode=DesaturateMode, HueRange=HueRange, GradientType=GradientType,
+	ChannelOps=ChannelOps, AddMaskType=AddMaskType, InterpolationType=InterpolationType, GradientBlendColorSpace=GradientBlendColorSpace, PDBStatusType=PDBStatusType,
+	RunMode=RunMode, PDBProcType=PDBProcType, Image=Image, Layer=Layer, GroupLayer=GroupLayer,
+	Selection=Selection, DrawableFilter=DrawableFilter, Choice=Choice, Procedure=ImageProcedure, ImageProcedure=ImageProcedure, PlugIn=PlugIn, Parasite=Parasite,
+	edit_named_copy=edit_named_copy, edit_named_paste=edit_named_paste, floating_sel_anchor=floating_sel_anchor,
+	buffers_get_name_list=buffers_get_name_list, buffer_delete=buffer_delete,
+	buffer_get_width=lambda name: buffers[name][0], buffer_get_height=lambda name: buffers[name][1],
+	buffer_get_bytes=lambda name: buffers[name][2], attach_parasite=attach_parasite, get_parasite=get_parasite, detach_parasite=detach_parasite,
+	PARASITE_PERSISTENT=1, main=lambda *args: 0)
+
+Gegl = MakeModule('gi.repository.Gegl', Color=Color)
+Babl = MakeModule('gi.repository.Babl')
+GLib = MakeModule('gi.repository.GLib', Error=lambda *args: None)
+GObject = MakeModule('gi.repository.GObject', ParamFlags=ParamFlags)
+GimpUi = MakeModule('gi.repository.GimpUi')
+Gio = MakeModule('gi.repository.Gio')
+
+#registers the stand-in modules under the names the plugin imports
+def Install():
+	repository = MakeModule('gi.repository', Gimp=Gimp, Gegl=Gegl, Babl=Babl, GLib=GLib, GObject=GObject,
+							GimpUi=GimpUi, Gio=Gio)
+	gi = MakeModule('gi', repository=repository, require_version=lambda *args: None)
+
+	sys.modules['gi'] = gi
+	sys.modules['gi.repository'] = repository
+	for module in (Gimp, Gegl, Babl, GLib, GObject, GimpUi, Gio):
+		sys.modules[module.__name__] = module
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+'''
+Batch processing for the headless Instagram engine. Applies a list of effects to every image matching a directory
+or glob and writes the results to an output directory, keeping the subfolders of the inputs, using a pool of
+worker processes. Each worker decodes one image at a time, applies the effects one after the other and encodes
+each result before moving on, so memory stays bounded by the size of a single image. A failure on one file is
+reported without stopping the batch. Decoding and encoding use Pillow.
+
+    python3 instagram_batch.py INPUT OUTPUT_DIR [-e EFFECT ...] [-j WORKERS] [--format jpg] [--lut 65]
+'''
+
+import os, sys, glob, time, argparse
+from collections import namedtuple
+from multiprocessing import Pool
+
+import numpy as np
+import instagram_engine, instagram_lut
+
+#file types picked up when the input is a directory
+imageExtensions = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.webp', '.bmp')
+
+#the outcome of processing one input file
+Result = namedtuple('Result', ['path', 'outputs', 'errors', 'pixels'])
+
+#returns the sorted list of input files for a directory or glob pattern
+def FindInputs(source):
+	if os.path.isdir(source):
+		paths = [os.path.join(source, name) for name in os.listdir(source)]
+	else:
+		paths = glob.glob(source)
+
+	return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(imageExtensions))
+
+#returns the directory each input is written to: the output directory plus the folder of the input below the
+#folder shared by all inputs, so inputs of the same name from different folders do not overwrite each other
+def OutputDirs(inputs, outdir):
+	folders = [os.path.dirname(os.path.abspath(path)) for path in inputs]
+	root = os.path.commonpath(folders)
+
+	return [os.path.normpath(os.path.join(outdir, os.path.relpath(folder, root))) for folder in folders]
+
+def OutputPath(outdir, path, effect, fmt):
+	stem = os.path.splitext(os.path.basename(path))[0]
+	return os.path.join(outdir, f"{stem}_{effect.lower()}.{fmt}")
+
+#decodes an image into an RGB or RGBA uint8 array
+def Decode(path):
+	from PIL import Image
+
+	with Image.open(path) as image:
+		mode = 'RGBA' if 'A' in image.getbands() else 'RGB'
+		return np.asarray(image.convert(mode))
+
+def Encode(path, pixels, quality):
+	from PIL import Image
+
+	image = Image.fromarray(pixels)
+	if path.lower().endswith(('.jpg', '.jpeg')):
+		image.convert('RGB').save(path, quality=quality)
+	else:
+		image.save(path)
+
+#applies all effects to one file. Runs in a worker process and never raises, so one bad file cannot stop the pool.
+def ProcessFile(task):
+	path, effects, outdir, fmt, quality, lutSize = task
+	outputs, errors = [], []
+
+	try:
+		os.makedirs(outdir, exist_ok=True)
+		pixels = Decode(path)
+	except Exception as e:
+		return Result(path, outputs, [f"decode: {e}"], 0)
+
+	for effect in effects:
+		try:
+			if lutSize:
+				filtered = instagram_lut.Apply(pixels, effect, lutSize)
+			else:
+				filtered = instagram_engine.Apply(pixels, effect)
+
+			out = OutputPath(outdir, path, effect, fmt)
+			Encode(out, filtered, quality)
+			outputs.append(out)
+			del filtered
+		except Exception as e:
+			errors.append(f"{effect}: {e}")
+
+	return Result(path, outputs, errors, pixels.shape[0] * pixels.shape[1])
+
+#processes the inputs on a pool of workers and returns a summary dictionary
+def RunBatch(inputs, effects, outdir, workers=None, fmt='jpg', quality=92, lutSize=None, log=None):
+	for effect in effects:
+		if effect not in instagram_engine.effectFunctions:
+			raise ValueError(f"Unknown effect {effect}")
+
+	dirs = OutputDirs(inputs, outdir) if inputs else []
+
+	#inputs that differ only in their extension, such as photo.jpg and photo.png, would still share outputs
+	seen = {}
+	for path, folder in zip(inputs, dirs):
+		key = (folder, os.path.splitext(os.path.basename(path))[0])
+		if key in seen:
+			raise ValueError(f"{seen[key]} and {path} would be written to the same outputs")
+		seen[key] = path
+
+	os.makedirs(outdir, exist_ok=True)
+	workers = workers or os.cpu_count() or 1
+	tasks = [(path, effects, folder, fmt, quality, lutSize) for path, folder in zip(inputs, dirs)]
+
+	start = time.perf_counter()
+	written, failed, pixels = 0, [], 0
+
+	#workers are replaced periodically so that fragmented memory is returned to the system
+	with Pool(workers, maxtasksperchild=50) as pool:
+		for result in pool.imap_unordered(ProcessFile, tasks, chunksize=1):
+			written += len(result.outputs)
+			pixels += result.pixels * len(result.outputs)
+			for error in result.errors:
+				failed.append((result.path, error))
+				if log:
+					log(f"FAILED {result.path}: {error}")
+
+	elapsed = time.perf_counter() - start
+
+	return {
+		'inputs': len(inputs),
+		'effects': len(effects),
+		'outputs': written,
+		'failures': len(failed),
+		'errors': failed,
+		'workers': workers,
+		'seconds': elapsed,
+		'images_per_second': written / elapsed if elapsed > 0 else 0.0,
+		'megapixels_per_second': pixels / 1e6 / elapsed if elapsed > 0 else 0.0
+	}
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Apply Instagram effects to a directory or glob of images.")
+	parser.add_argument("input", help="input directory or glob pattern")
+	parser.add_argument("outdir", help="output directory")
+	parser.add_argument("-e", "--effects", nargs="+", default=list(instagram_engine.effectFunctions), help="effect identifiers, defaults to all")
+	parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes, defaults to the CPU count")
+	parser.add_argument("--format", default="jpg", choices=["jpg", "png", "tif", "webp"], help="output file format")
+	parser.add_argument("--quality", type=int, default=92, help="JPEG/WebP quality")
+	parser.add_argument("--lut", type=int, default=None, choices=instagram_lut.lutSizes, help="apply the color sections through cached 3D LUTs of this size")
+	args = parser.parse_args(argv)
+
+	inputs = FindInputs(args.input)
+	if not inputs:
+		print(f"No images found for {args.input}", file=sys.stderr)
+		return 1
+
+	summary = RunBatch(inputs, args.effects, args.outdir, args.workers, args.format, args.quality, args.lut,
+					   log=lambda line: print(line, file=sys.stderr))
+
+	print(f"{summary['outputs']} images written from {summary['inputs']} inputs x {summary['effects']} effects, "
+		  f"{summary['failures']} failed, {summary['seconds']:.2f} s on {summary['workers']} workers, "
+		  f"{summary['images_per_second']:.2f} images/s ({summary['megapixels_per_second']:.1f} MP/s)")
+
+	return 1 if summary['failures'] else 0
+
+if __name__ == '__main__':
+	sys.exit(main())
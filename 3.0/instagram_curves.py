@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+'''
+Pure Python curve helpers for the GIMP 3 Instagram plugin. The functions reproduce the way GIMP samples
+and interpolates smooth curves and levels, so that a chain of curve, sRGB workaround and levels steps
+on a drawable can be composed into one lookup table per channel and applied with a single
+curves_explicit call instead of one full-image pass per step.
+'''
+
+import math
+from functools import lru_cache
+
+#version of the effects, used to key anything cached or measured from their output
+pluginVersion = "3.0.1"
+
+#
+# --- Channel numbers, matching the values of Gimp.HistogramChannel ---
+#
+
+VALUE, RED, GREEN, BLUE = range(4)
+COLORS = (RED, GREEN, BLUE)
+
+#number of samples GIMP holds for a smooth curve
+splineSamples = 256
+
+#number of samples in a compiled lookup table passed to curves_explicit
+chainSamples = 1024
+
+#
+# --- Sampling and interpolation ---
+#
+
+#rounds half away from zero, like the ROUND macro used by GIMP
+def Round(value):
+	return int(math.floor(value + 0.5))
+
+#builds the lookup tables for the sRGB workaround. The first table takes a value held in linear space to
+#its sRGB encoding and the second decodes it back, so a curve applied in between acts in non-linear space.
+@lru_cache(maxsize=None)
+def FastSRGBLuts(samplecount=1024):
+	pow = math.pow
+	sc = samplecount - 1.0
+
+	# sRGB -> linear
+	linofx = [
+		(x * 12.92) if x < 0.0031308
+		else (1.055 * pow(x, 1.0/2.4) - 0.055)
+		for x in (i / sc for i in range(samplecount))
+	]
+
+	# linear -> sRGB
+	srgbofx = [
+		(x / 12.92) if x < 0.04045
+		else pow((x + 0.055) / 1.055, 2.4)
+		for x in (i / sc for i in range(samplecount))
+	]
+
+	return tuple(linofx), tuple(srgbofx)
+
+#maps a value through a sampled curve, interpolating between samples as gimp_curve_map_value does
+def MapSamples(samples, value):
+	if value < 0.0:
+		return samples[0]
+	elif value >= 1.0:
+		return samples[-1]
+
+	value *= len(samples) - 1
+	index = int(value)
+	f = value - index
+
+	return (1.0 - f) * samples[index] + f * samples[index + 1]
+
+#calculates the samples of a smooth curve from a flat [x1, y1, x2, y2, ...] list, following gimp_curve_calculate
+@lru_cache(maxsize=64)
+def SplineSamples(points, samplecount=splineSamples):
+	pts = sorted(zip(points[0::2], points[1::2]))
+	n = len(pts)
+	sc = samplecount - 1
+	samples = [0.0] * samplecount
+
+	if n == 0:
+		return tuple(i / sc for i in range(samplecount))
+
+	#initialize the boundaries outside the first and last points
+	boundary = Round(pts[0][0] * sc)
+	for i in range(boundary):
+		samples[i] = pts[0][1]
+
+	boundary = Round(pts[-1][0] * sc)
+	for i in range(boundary, samplecount):
+		samples[i] = pts[-1][1]
+
+	#plot each segment as a cubic bezier, taking the neighbouring points into account
+	for i in range(n - 1):
+		p1 = max(i - 1, 0)
+		p2 = i
+		p3 = i + 1
+		p4 = min(i + 2, n - 1)
+
+		x0, y0 = pts[p2]
+		x3, y3 = pts[p3]
+		dx = x3 - x0
+		dy = y3 - y0
+
+		if dx <= 0:
+			continue
+
+		if p1 == p2 and p3 == p4:
+			y1 = y0 + dy / 3.0
+			y2 = y0 + dy * 2.0 / 3.0
+		elif p1 == p2:
+			slope = (pts[p4][1] - y0) / (pts[p4][0] - x0)
+			y2 = y3 - slope * dx / 3.0
+			y1 = y0 + (y2 - y0) / 2.0
+		elif p3 == p4:
+			slope = (y3 - pts[p1][1]) / (x3 - pts[p1][0])
+			y1 = y0 + slope * dx / 3.0
+			y2 = y3 + (y1 - y3) / 2.0
+		else:
+			slope = (y3 - pts[p1][1]) / (x3 - pts[p1][0])
+			y1 = y0 + slope * dx / 3.0
+			slope = (pts[p4][1] - y0) / (pts[p4][0] - x0)
+			y2 = y3 - slope * dx / 3.0
+
+		offset = Round(x0 * sc)
+		for j in range(Round(dx * sc) + 1):
+			t = j / dx / sc
+			y = (y0 * (1 - t) * (1 - t) * (1 - t) +
+				 3 * y1 * (1 - t) * (1 - t) * t +
+				 3 * y2 * (1 - t) * t * t +
+				 y3 * t * t * t)
+
+			index = j + offset
+			if index < samplecount:
+				samples[index] = min(max(y, 0.0), 1.0)
+
+	#make sure the control points are used exactly
+	for x, y in pts:
+		samples[Round(x * sc)] = y
+
+	return tuple(samples)
+
+#maps a value through a levels adjustment, following gimp_operation_levels_map
+def LevelsMap(value, lowInput, highInput, clampInput, gamma, lowOutput, highOutput, clampOutput):
+	if highInput != lowInput:
+		value = (value - lowInput) / (highInput - lowInput)
+	else:
+		value = value - lowInput
+
+	if clampInput:
+		value = min(max(value, 0.0), 1.0)
+
+	if gamma != 1.0 and value > 0:
+		value = math.pow(value, 1.0 / gamma)
+
+	if highOutput >= lowOutput:
+		value = value * (highOutput - lowOutput) + lowOutput
+	else:
+		value = lowOutput - value * (lowOutput - highOutput)
+
+	if clampOutput:
+		value = min(max(value, 0.0), 1.0)
+
+	return value
+
+#
+# --- Curve compiler ---
+#
+
+#collects the curve and levels steps applied to a drawable and composes them into one lookup table per channel.
+#Levels are assumed to act in the same space as curves_explicit, which is what the sRGB workaround relies on.
+class CurveChain:
+	def __init__(self, samplecount=chainSamples):
+		self.samplecount = samplecount
+		self.stages = {channel: [] for channel in COLORS}
+
+	#appends a per-value mapping to the channels affected by a GIMP histogram channel
+	def AddStage(self, channel, stage):
+		channel = int(channel)
+		if channel == VALUE:
+			for c in COLORS:
+				self.stages[c].append(stage)
+		elif channel in COLORS:
+			self.stages[channel].append(stage)
+		else:
+			raise ValueError(f"Unsupported channel {channel} in curve chain")
+
+		return self
+
+	#equivalent of drawable.curves_explicit(channel, samples)
+	def Explicit(self, channel, samples):
+		samples = tuple(samples)
+		return self.AddStage(channel, lambda v: MapSamples(samples, v))
+
+	#equivalent of drawable.curves_spline(channel, points)
+	def Spline(self, channel, points):
+		samples = SplineSamples(tuple(points))
+		return self.AddStage(channel, lambda v: MapSamples(samples, v))
+
+	#equivalent of the three passes made by Instagram.SRGBCurvesSpline
+	def SRGBSpline(self, channel, points):
+		lin_lut, srgb_lut = FastSRGBLuts()
+		self.Explicit(channel, lin_lut)
+		self.Spline(channel, points)
+		return self.Explicit(channel, srgb_lut)
+
+	#equivalent of drawable.levels(channel, ...)
+	def Levels(self, channel, lowInput, highInput, clampInput, gamma, lowOutput, highOutput, clampOutput):
+		args = (lowInput, highInput, clampInput, gamma, lowOutput, highOutput, clampOutput)
+		return self.AddStage(channel, lambda v: LevelsMap(v, *args))
+
+	#maps a single value through all stages of a channel
+	def Map(self, channel, value):
+		for stage in self.stages[channel]:
+			value = stage(value)
+
+		return value
+
+	#returns a list of (channel, samples) pairs, using the VALUE channel when the colors share the same table
+	def Compile(self):
+		sc = self.samplecount - 1.0
+		xs = [i / sc for i in range(self.samplecount)]
+
+		luts = []
+		for channel in COLORS:
+			if self.stages[channel]:
+				luts.append((channel, [self.Map(channel, x) for x in xs]))
+
+		if len(luts) == 3 and luts[0][1] == luts[1][1] == luts[2][1]:
+			return [(VALUE, luts[0][1])]
+
+		return luts
@@ -0,0 +1,839 @@
+#!/usr/bin/env python3
+
+'''
+A headless NumPy version of the GIMP 3 Instagram plugin. Each effect is rebuilt from vectorized versions of the
+operations used by the plugin (levels, curves, hue/saturation, brightness/contrast, desaturate, color to alpha,
+gradients, feathered vignettes, noise, motion blur and the layer modes) so that images can be processed without
+starting GIMP. Pixels are held as floats in non-linear sRGB, layers are blended in the space GIMP uses for each
+mode and composited in linear light. Colors passed to fills and gradients are linear, as with Gegl.Color.set_rgba.
+'''
+
+import os, math
+import numpy as np
+from functools import lru_cache
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from instagram_curves import SplineSamples, VALUE, RED, GREEN, BLUE
+
+#
+# --- Constants mirroring the GIMP enums used by the plugin ---
+#
+
+#Gimp.LayerMode values
+OVERLAY = 23
+NORMAL = 28
+MULTIPLY = 30
+SCREEN = 31
+DODGE = 42
+HARDLIGHT = 44
+SOFTLIGHT = 45
+
+#Gimp.DesaturateMode values
+LIGHTNESS, LUMINANCE, AVERAGE, LUMINOSITY, VALUEMODE = range(5)
+
+#Vignettes option values
+STANDARD, LARGE, OBLATE, NONE = range(4)
+
+#modes that GIMP blends in linear light, all others are blended in perceptual space
+linearBlendModes = (MULTIPLY,)
+
+#proxy size used to feather vignette masks before scaling them up
+featherProxy = 256
+
+#bytes of float pixels in each strip ApplyParallel gives a worker, so a strip and its temporaries stay in cache
+stripBytes = int(float(os.environ.get('INSTAGRAM_STRIP_KB', 512)) * 1024)
+
+#feathered vignette masks kept between calls, keyed by (w, h, type), least recently used first
+maskCache = OrderedDict()
+maskCacheBytes = int(float(os.environ.get('INSTAGRAM_MASK_CACHE_MB', 256)) * (1 << 20))
+
+#a layer in an effect group, composited bottom to top
+Layer = namedtuple('Layer', ['name', 'pixels', 'mode', 'opacity', 'mask'])
+
+#the size of the whole image, the first row of the strip of it being processed, the size of the image relative
+#to the full size one when previewing on a reduced copy, and the factor smooth spatial parts are reduced by in
+#draft quality
+Frame = namedtuple('Frame', ['w', 'h', 'y0', 'scale', 'draft'], defaults=[1.0, 1])
+
+#
+# --- Conversions ---
+#
+
+def SRGBToLinear(x):
+	return np.where(x <= 0.04045, x / 12.92, np.power((np.maximum(x, 0.04045) + 0.055) / 1.055, 2.4))
+
+def LinearToSRGB(x):
+	return np.where(x <= 0.0031308, x * 12.92, 1.055 * np.power(np.maximum(x, 0.0031308), 1.0 / 2.4) - 0.055)
+
+#converts an RGB(A) array of any integer or float type into RGBA float32 in the range [0, 1]
+def ToFloat(pixels):
+	pixels = np.asarray(pixels)
+	if np.issubdtype(pixels.dtype, np.integer):
+		out = pixels.astype(np.float32) / np.iinfo(pixels.dtype).max
+	else:
+		out = pixels.astype(np.float32)
+
+	if out.shape[-1] == 3:
+		out = np.concatenate([out, np.ones(out.shape[:-1] + (1,), np.float32)], axis=-1)
+
+	return out
+
+#converts RGBA floats back into the type and channel count of a reference array
+def FromFloat(pixels, reference):
+	reference = np.asarray(reference)
+	pixels = np.clip(pixels[..., :reference.shape[-1]], 0.0, 1.0)
+	if np.issubdtype(reference.dtype, np.integer):
+		scale = np.iinfo(reference.dtype).max
+		return np.rint(pixels * scale).astype(reference.dtype)
+
+	return pixels.astype(reference.dtype)
+
+#returns a copy of the pixels with new RGB values and the original alpha
+def WithRGB(pixels, rgb):
+	return np.concatenate([rgb, pixels[..., 3:]], axis=-1).astype(np.float32)
+
+#
+# --- Per-pixel color operations ---
+#
+
+#applies a per-value mapping to the channels selected by a GIMP histogram channel
+def MapChannel(pixels, channel, fn):
+	out = pixels.copy()
+	channels = [0, 1, 2] if channel == VALUE else [channel - 1]
+	for c in channels:
+		out[..., c] = fn(out[..., c])
+
+	return out
+
+#equivalent of drawable.levels
+def Levels(pixels, channel, lowInput, highInput, clampInput, gamma, lowOutput, highOutput, clampOutput):
+	def fn(value):
+		if highInput != lowInput:
+			value = (value - lowInput) / (highInput - lowInput)
+		else:
+			value = value - lowInput
+
+		if clampInput:
+			value = np.clip(value, 0.0, 1.0)
+
+		if gamma != 1.0:
+			value = np.where(value > 0, np.power(np.maximum(value, 0.0), 1.0 / gamma), value)
+
+		if highOutput >= lowOutput:
+			value = value * (highOutput - lowOutput) + lowOutput
+		else:
+			value = lowOutput - value * (lowOutput - highOutput)
+
+		if clampOutput:
+			value = np.clip(value, 0.0, 1.0)
+
+		return value
+
+	return MapChannel(pixels, channel, fn)
+
+#equivalent of Instagram.SRGBCurvesSpline, a GIMP smooth curve applied in non-linear space
+def CurvesSpline(pixels, channel, points):
+	samples = np.asarray(SplineSamples(tuple(points)), np.float32)
+	xs = np.linspace(0.0, 1.0, len(samples), dtype=np.float32)
+
+	return MapChannel(pixels, channel, lambda value: np.interp(value, xs, samples).astype(np.float32))
+
+#equivalent of drawable.brightness_contrast, with both values in the range [-1, 1]
+def BrightnessContrast(pixels, brightness, contrast):
+	brightness = brightness / 2.0
+	slant = math.tan((contrast + 1) * math.pi / 4)
+
+	rgb = pixels[..., :3]
+	if brightness < 0.0:
+		rgb = rgb * (1.0 + brightness)
+	else:
+		rgb = rgb + (1.0 - rgb) * brightness
+
+	rgb = (rgb - 0.5) * slant + 0.5
+
+	return WithRGB(pixels, rgb)
+
+#equivalent of drawable.desaturate
+def Desaturate(pixels, mode=LIGHTNESS):
+	rgb = pixels[..., :3]
+	if mode == LIGHTNESS:
+		grey = (rgb.max(axis=-1) + rgb.min(axis=-1)) / 2
+	elif mode == VALUEMODE:
+		grey = rgb.max(axis=-1)
+	elif mode == AVERAGE:
+		grey = rgb.mean(axis=-1)
+	else:
+		linear = SRGBToLinear(rgb)
+		grey = LinearToSRGB(linear @ np.array([0.2126, 0.7152, 0.0722], np.float32))
+
+	return WithRGB(pixels, np.repeat(grey[..., None], 3, axis=-1))
+
+def RGBToHSL(rgb):
+	maxc = rgb.max(axis=-1)
+	minc = rgb.min(axis=-1)
+	l = (maxc + minc) / 2
+	delta = maxc - minc
+	safe = np.where(delta == 0, 1.0, delta)
+
+	s = np.where(l <= 0.5, delta / np.where(maxc + minc == 0, 1.0, maxc + minc),
+				 delta / np.where(2.0 - maxc - minc == 0, 1.0, 2.0 - maxc - minc))
+
+	r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+	h = np.where(maxc == r, (g - b) / safe,
+				 np.where(maxc == g, 2.0 + (b - r) / safe, 4.0 + (r - g) / safe)) / 6.0
+	h = np.where(delta == 0, 0.0, h % 1.0)
+	s = np.where(delta == 0, 0.0, s)
+
+	return h, s, l
+
+def HSLToRGB(h, s, l):
+	q = np.where(l <= 0.5, l * (1.0 + s), l + s - l * s)
+	p = 2.0 * l - q
+
+	def hue(t):
+		t = t % 1.0
+		return np.where(t < 1 / 6, p + (q - p) * 6.0 * t,
+						np.where(t < 1 / 2, q,
+								 np.where(t < 2 / 3, p + (q - p) * (2 / 3 - t) * 6.0, p)))
+
+	return np.stack([hue(h + 1 / 3), hue(h), hue(h - 1 / 3)], axis=-1)
+
+#equivalent of drawable.hue_saturation for Gimp.HueRange.ALL, with the offsets in PDB units
+def HueSaturation(pixels, hueOffset, lightness, saturation):
+	h, s, l = RGBToHSL(np.clip(pixels[..., :3], 0.0, 1.0))
+
+	h = (h + hueOffset / 360.0) % 1.0
+	s = np.clip(s * (saturation / 100.0 + 1.0), 0.0, 1.0)
+
+	v = lightness / 200.0
+	if v < 0:
+		l = l * (v + 1.0)
+	else:
+		l = l + v * (1.0 - l)
+
+	return WithRGB(pixels, HSLToRGB(h, s, l))
+
+#equivalent of the gegl:color-to-alpha filter
+def ColorToAlpha(pixels, transpThresh=0.0, opacityThresh=1.0, color=(1.0, 1.0, 1.0)):
+	eps = 1e-5
+	color = np.asarray(color, np.float32)
+	rgb = pixels[..., :3]
+
+	d = np.abs(rgb - color)
+	limit = np.where(rgb < color, np.minimum(opacityThresh, color), np.minimum(opacityThresh, 1.0 - color))
+	denom = np.where(limit - transpThresh == 0, 1.0, limit - transpThresh)
+
+	a = np.where(d < transpThresh + eps, 0.0,
+				 np.where(d > opacityThresh - eps, 1.0, (d - transpThresh) / denom))
+	alpha = np.clip(a, 0.0, 1.0).max(axis=-1)
+
+	safe = np.where(alpha < eps, 1.0, alpha)[..., None]
+	rgb = np.where(alpha[..., None] < eps, 0.0, (rgb - color) / safe + color)
+
+	return np.concatenate([rgb, (pixels[..., 3] * alpha)[..., None]], axis=-1).astype(np.float32)
+
+#
+# --- Generated layers ---
+#
+
+#returns a transparent layer of shape (h, w, 4), like a new layer filled with Gimp.FillType.TRANSPARENT
+def EmptyLayer(w, h):
+	return np.zeros((h, w, 4), np.float32)
+
+#returns a layer of shape (h, w, 4) filled with a linear color
+def ColorLayer(w, h, r, g, b):
+	color = LinearToSRGB(np.array([r, g, b], np.float32))
+	out = np.empty((h, w, 4), np.float32)
+	out[..., :3] = color
+	out[..., 3] = 1.0
+
+	return out
+
+#returns distances from a point for each pixel center, scaled by a radius. Generated layers are h rows high
+#and start at row y0 of the image.
+def RadialDistance(w, h, x, y, radius, y0=0):
+	ys, xs = np.mgrid[y0:y0 + h, 0:w].astype(np.float32)
+	return np.hypot(xs + 0.5 - x, ys + 0.5 - y) / max(radius, 1e-6)
+
+#returns a radial FG to transparent gradient, like edit_gradient_fill with Gimp.GradientType.RADIAL
+def RadialGradient(w, h, x1, y1, x2, y2, r, g, b, reverse=False, y0=0):
+	t = np.clip(RadialDistance(w, h, x1, y1, math.hypot(x2 - x1, y2 - y1), y0), 0.0, 1.0)
+	out = ColorLayer(w, h, r, g, b)
+	out[..., 3] = t if reverse else 1.0 - t
+
+	return out
+
+#returns a linear or bilinear FG to BG gradient, blended in linear RGB
+def LinearGradient(w, h, x1, y1, x2, y2, color1, color2, bilinear=False, y0=0):
+	ys, xs = np.mgrid[y0:y0 + h, 0:w].astype(np.float32)
+	dx, dy = x2 - x1, y2 - y1
+	length = max(dx * dx + dy * dy, 1e-6)
+	t = ((xs + 0.5 - x1) * dx + (ys + 0.5 - y1) * dy) / length
+	t = np.clip(np.abs(t) if bilinear else t, 0.0, 1.0)[..., None]
+
+	linear = np.asarray(color1, np.float32) * (1.0 - t) + np.asarray(color2, np.float32) * t
+	out = np.empty((h, w, 4), np.float32)
+	out[..., :3] = LinearToSRGB(linear)
+	out[..., 3] = 1.0
+
+	return out
+
+#resizes a 2D array with bilinear sampling of pixel centers, returning all rows or the given number from y0
+def Resize(values, w, h, y0=0, rows=None):
+	sh, sw = values.shape
+	rows = h - y0 if rows is None else rows
+	xs = np.clip((np.arange(w) + 0.5) * sw / w - 0.5, 0, sw - 1)
+	ys = np.clip((np.arange(y0, y0 + rows) + 0.5) * sh / h - 0.5, 0, sh - 1)
+
+	x0 = np.floor(xs).astype(int)
+	y0 = np.floor(ys).astype(int)
+	x1 = np.minimum(x0 + 1, sw - 1)
+	y1 = np.minimum(y0 + 1, sh - 1)
+	fx = (xs - x0)[None, :]
+	fy = (ys - y0)[:, None]
+
+	top = values[y0][:, x0] * (1 - fx) + values[y0][:, x1] * fx
+	bottom = values[y1][:, x0] * (1 - fx) + values[y1][:, x1] * fx
+
+	return (top * (1 - fy) + bottom * fy).astype(np.float32)
+
+#applies a separable gaussian blur to a 2D array, clamping at the edges
+def GaussianBlur(values, sigma):
+	if sigma <= 0:
+		return values
+
+	radius = int(math.ceil(3 * sigma))
+	kernel = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+	kernel = (kernel / kernel.sum()).astype(np.float32)
+
+	for axis in (0, 1):
+		padded = np.pad(values, [(radius, radius) if a == axis else (0, 0) for a in (0, 1)], mode='edge')
+		n = values.shape[axis]
+		out = np.zeros_like(values)
+		for i, k in enumerate(kernel):
+			out += k * (padded[i:i + n] if axis == 0 else padded[:, i:i + n])
+		values = out
+
+	return values
+
+#returns the ellipse rectangle used by Instagram.SelectEllipse
+def EllipseBounds(w, h, type):
+	if type == STANDARD:
+		return 0, 0, w, h
+	elif type == LARGE:
+		delta = 0.05 * w
+		return 0 - delta, 0 - delta, w + (delta * 2), h + (delta * 2)
+	elif type == OBLATE:
+		delta = w / 6
+		epsilon = 0.05 * h
+		return 0 - delta, 0 + epsilon, w + delta * 2, h - epsilon * 2
+
+	return None
+
+#returns a feathered ellipse selection as values in [0, 1], reusing a cached mask of the same size and type.
+#A strip of rows is scaled up from the feathered proxy on its own.
+def EllipseMask(w, h, type, y0=0, rows=None):
+	if rows is not None and (y0, rows) != (0, h):
+		return Resize(FeatherProxy(w, h, type), w, h, y0, rows)
+
+	key = (w, h, type)
+	if key in maskCache:
+		maskCache.move_to_end(key)
+		return maskCache[key]
+
+	mask = Resize(FeatherProxy(w, h, type), w, h)
+
+	#cached masks are shared, so they are made read-only
+	mask.setflags(write=False)
+	maskCache[key] = mask
+	while len(maskCache) > 1 and sum(m.nbytes for m in maskCache.values()) > maskCacheBytes:
+		maskCache.popitem(last=False)
+
+	return mask
+
+#feathers an ellipse selection on a reduced proxy, which is accurate because the feather radius is 20% of the
+#image size. The proxy is scaled up to full size by EllipseMask.
+@lru_cache(maxsize=32)
+def FeatherProxy(w, h, type):
+	bounds = EllipseBounds(w, h, type)
+	if bounds is None:
+		return np.zeros((1, 1), np.float32)
+
+	scale = min(1.0, featherProxy / max(w, h))
+	pw = max(1, int(round(w * scale)))
+	ph = max(1, int(round(h * scale)))
+	sx, sy = pw / w, ph / h
+
+	x, y, ew, eh = bounds
+	ys, xs = np.mgrid[0:ph, 0:pw].astype(np.float32)
+	nx = ((xs + 0.5) / sx - (x + ew / 2)) / (ew / 2)
+	ny = ((ys + 0.5) / sy - (y + eh / 2)) / (eh / 2)
+	mask = (nx * nx + ny * ny <= 1.0).astype(np.float32)
+
+	#GIMP feathers with a gaussian whose standard deviation is the radius / 3.5
+	feather = 0.20 * max(w, h)
+	mask = GaussianBlur(mask, feather / 3.5 * scale)
+	mask.setflags(write=False)
+
+	return mask
+
+#equivalent of Instagram.CreateVignette, a color filling the area outside a feathered ellipse
+def Vignette(w, h, type, r=0.0, g=0.0, b=0.0, y0=0, rows=None):
+	out = ColorLayer(w, h if rows is None else rows, r, g, b)
+	out[..., 3] = 1.0 - EllipseMask(w, h, type, y0, rows)
+
+	return out
+
+#sums each run of length + 1 samples along the rows of a 2D array, centered on each pixel and clamping at the
+#edges, as gegl:motion-blur-linear samples a whole length at angle 0. An odd length puts the samples between
+#pixels, which interpolating linearly turns into the mean of the two neighbouring runs. Each sum is a difference
+#of running sums, so the cost does not depend on the length.
+def RunSums(values, length):
+	h, w = values.shape
+	n = length + 1
+	start = math.floor(-length / 2)
+	half = -length / 2 - start
+	pad = n + 1
+
+	sums = np.zeros((h, w + 2 * pad + 1), np.float64)
+	np.cumsum(np.pad(values, [(0, 0), (pad, pad)], mode='edge'), axis=1, out=sums[:, 1:])
+
+	first = pad + start
+	runs = sums[:, first + n:first + n + w] - sums[:, first:first + w]
+	if half:
+		runs = (1.0 - half) * runs + half * (sums[:, first + n + 1:first + n + 1 + w] - sums[:, first + 1:first + 1 + w])
+
+	return runs
+
+#equivalent of the gegl:motion-blur-linear filter at angle 0, averaged in premultiplied linear light. Whole
+#lengths take the same samples as GEGL, and other lengths blend the results of the two nearest whole lengths.
+def MotionBlur(pixels, length=256):
+	linear = WithRGB(pixels, SRGBToLinear(pixels[..., :3]))
+	linear[..., :3] *= linear[..., 3:]
+
+	lower = int(math.floor(length))
+	blend = length - lower
+	out = np.empty_like(linear)
+	for c in range(4):
+		channel = RunSums(linear[..., c], lower) / (lower + 1)
+		if blend > 0:
+			channel = (1.0 - blend) * channel + blend * RunSums(linear[..., c], lower + 1) / (lower + 2)
+		out[..., c] = channel
+
+	alpha = out[..., 3:]
+	rgb = np.where(alpha > 0, out[..., :3] / np.where(alpha > 0, alpha, 1.0), 0.0)
+
+	return np.concatenate([LinearToSRGB(rgb), alpha], axis=-1).astype(np.float32)
+
+#equivalent of MotionBlur for draft quality. The blur only runs along rows, so the rows are averaged down by a
+#factor, blurred with a shorter length and interpolated back up, leaving the vertical detail untouched. The edge
+#pixels are repeated over half the blur length first, as the full size blur clamps to them.
+def DraftMotionBlur(pixels, length=256, factor=4):
+	if factor <= 1:
+		return MotionBlur(pixels, length)
+
+	h, w = pixels.shape[:2]
+	edge = -(-int(math.ceil(length / 2)) // factor)
+	sw = -(-w // factor) + 2 * edge
+	padded = np.pad(pixels, [(0, 0), (edge * factor, sw * factor - w - edge * factor), (0, 0)], mode='edge')
+
+	#average in premultiplied linear light, as the blur does
+	linear = WithRGB(padded, SRGBToLinear(padded[..., :3]))
+	linear[..., :3] *= linear[..., 3:]
+	small = linear.reshape(h, sw, factor, -1).mean(axis=2)
+	alpha = small[..., 3:]
+	rgb = np.where(alpha > 0, small[..., :3] / np.where(alpha > 0, alpha, 1.0), 0.0)
+	small = MotionBlur(np.concatenate([LinearToSRGB(rgb), alpha], axis=-1).astype(np.float32), length / factor)
+
+	xs = np.clip((np.arange(w) + 0.5) / factor - 0.5 + edge, 0, sw - 1)
+	x0 = np.floor(xs).astype(int)
+	x1 = np.minimum(x0 + 1, sw - 1)
+	fx = (xs - x0)[None, :, None]
+
+	return (small[:, x0] * (1 - fx) + small[:, x1] * fx).astype(np.float32)
+
+#equivalent of the gegl:noise-rgb filter with gaussian, linear and non-independent settings. Without independent
+#channels GEGL draws one value for each pixel and adds it to all three, so the noise is monochrome.
+def Noise(pixels, amount=0.10, seed=0):
+	rng = np.random.default_rng(seed)
+	noise = rng.standard_normal(pixels.shape[:-1] + (1,), dtype=np.float32) * (amount * 0.5)
+	linear = np.clip(SRGBToLinear(pixels[..., :3]) + noise, 0.0, 1.0)
+
+	return WithRGB(pixels, LinearToSRGB(linear))
+
+#
+# --- Layer modes and compositing ---
+#
+
+def BlendColors(inp, layer, mode):
+	if mode == MULTIPLY:
+		return inp * layer
+	elif mode == SCREEN:
+		return 1.0 - (1.0 - inp) * (1.0 - layer)
+	elif mode == OVERLAY:
+		return np.where(inp < 0.5, 2.0 * inp * layer, 1.0 - 2.0 * (1.0 - inp) * (1.0 - layer))
+	elif mode == HARDLIGHT:
+		return np.where(layer > 0.5, 1.0 - (1.0 - inp) * (1.0 - (layer - 0.5) * 2.0), np.minimum(inp * layer * 2.0, 1.0))
+	elif mode == SOFTLIGHT:
+		return (1.0 - inp) * (inp * layer) + inp * (1.0 - (1.0 - inp) * (1.0 - layer))
+	elif mode == DODGE:
+		return np.where(layer >= 1.0, 1.0, np.minimum(inp / np.maximum(1.0 - layer, 1e-6), 1.0))
+	elif mode == NORMAL:
+		return layer
+
+	raise ValueError(f"Unsupported layer mode {mode}")
+
+#returns the colors of a layer blended onto a backdrop in the space GIMP uses for the mode, as linear RGB
+def BlendLinear(inp, src, mode):
+	if mode in linearBlendModes:
+		return SRGBToLinear(BlendColors(SRGBToLinear(inp), SRGBToLinear(src), mode))
+
+	return SRGBToLinear(BlendColors(inp, src, mode))
+
+#composites a layer onto a backdrop. NORMAL uses union compositing and the other modes clip to the backdrop,
+#matching the defaults GIMP chooses for each mode.
+def Composite(backdrop, layer, mode=NORMAL, opacity=100, mask=None):
+	a = layer[..., 3] * (opacity / 100.0)
+	if mask is not None:
+		a = a * mask
+	a = a[..., None]
+
+	inp = backdrop[..., :3]
+	blend = BlendLinear(inp, layer[..., :3], mode)
+	base = SRGBToLinear(inp)
+	backdropA = backdrop[..., 3:]
+
+	if mode == NORMAL:
+		outA = a + backdropA * (1.0 - a)
+		rgb = (blend * a + base * backdropA * (1.0 - a)) / np.where(outA > 0, outA, 1.0)
+	else:
+		outA = backdropA
+		rgb = base * (1.0 - a) + blend * a
+
+	return np.concatenate([LinearToSRGB(np.clip(rgb, 0.0, 1.0)), outA], axis=-1).astype(np.float32)
+
+#paints onto a layer in a paint mode, as edit_gradient_fill does with the context paint mode. Painting uses union
+#compositing in every mode, so the paint is blended where the layer is opaque and kept as it is where it is clear.
+def Paint(layer, paint, mode=NORMAL, opacity=100):
+	a = (paint[..., 3] * (opacity / 100.0))[..., None]
+	b = layer[..., 3:]
+
+	src = SRGBToLinear(paint[..., :3])
+	blend = BlendLinear(layer[..., :3], paint[..., :3], mode)
+	base = SRGBToLinear(layer[..., :3])
+
+	outA = a + b * (1.0 - a)
+	rgb = (blend * a * b + src * a * (1.0 - b) + base * b * (1.0 - a)) / np.where(outA > 0, outA, 1.0)
+
+	return np.concatenate([LinearToSRGB(np.clip(rgb, 0.0, 1.0)), outA], axis=-1).astype(np.float32)
+
+#
+# --- Individual effects ---
+#
+# Each effect has a color function that returns the bottom of the layer group, built only from per-pixel
+# operations on the source, and a layers function that returns the layers stacked above it. Spatial parts
+# (vignettes, gradients, noise and blur) are left out when spatial is False, and vignette masks are then
+# replaced by their value at the center of the image.
+#
+
+#returns the image width and height, and the first row and number of rows of the source strip
+def Extent(src, frame):
+	rows, w = src.shape[:2]
+	if frame is None:
+		return w, rows, 0, rows
+
+	return frame.w, frame.h, frame.y0, rows
+
+#returns the scale of a frame, for sizes given in full size pixels
+def FrameScale(frame):
+	return 1.0 if frame is None else frame.scale
+
+#returns the draft factor of a frame, 1 for full quality
+def FrameDraft(frame):
+	return 1 if frame is None else frame.draft
+
+#returns a vignette mask, or its center value when spatial parts are left out
+def MaskOrCenter(w, h, type, spatial, y0=0, rows=None):
+	if spatial:
+		return EllipseMask(w, h, type, y0, rows)
+
+	return float(EllipseMask(64, 64, type)[32, 32])
+
+def AmaroColor(src):
+	out = CurvesSpline(src, RED, [0, 30/255, 156/255, 196/255, 205/255, 203/255, 255/255, 255/255])
+	out = CurvesSpline(out, GREEN, [0, 0, 61/255, 67/255, 139/255, 184/255, 200/255, 206/255, 1.0, 1.0])
+	out = CurvesSpline(out, BLUE, [0, 20/255, 146/255, 184/255, 220/255, 222/255, 1.0, 1.0])
+
+	return ColorToAlpha(out, 0.0, 0.78)
+
+def AmaroLayers(src, spatial, frame=None):
+	w, h, y0, rows = Extent(src, frame)
+	if not spatial:
+		return []
+
+	return [Layer('Vignette', Vignette(w, h, STANDARD, y0=y0, rows=rows), NORMAL, 60, None)]
+
+def ApolloColor(src):
+	return Composite(src, Desaturate(src, VALUEMODE), NORMAL, 50)
+
+def ApolloLayers(src, spatial, frame=None):
+	w, h, y0, rows = Extent(src, frame)
+	layers = []
+	if spatial:
+		layers.append(Layer('Vignette', Vignette(w, h, LARGE, y0=y0, rows=rows), NORMAL, 40, None))
+
+	layers.append(Layer('Color', ColorLayer(w, rows, 0.243, 0.804, 0.165), OVERLAY, 50, None))
+
+	return layers
+
+def BrannanColor(src):
+	h, w = src.shape[:2]
+
+	layer2 = HueSaturation(Desaturate(src, VALUEMODE), 0, 0, -30)
+	merged = Composite(src, layer2, OVERLAY, 37)
+
+	merged = Levels(merged, VALUE, 0, 1.0, True, 1.0, 9/255, 1.0, True)
+	merged = Levels(merged, RED, 0, 228/255, True, 1.0, 23/255, 1.0, True)
+	merged = Levels(merged, GREEN, 0, 1.0, True, 1.0, 3/255, 1.0, True)
+	merged = Levels(merged, BLUE, 0, 239/255, True, 1.0, 12/255, 1.0, True)
+	merged = BrightnessContrast(merged, -8/100, 25/100)
+
+	merged = Levels(merged, VALUE, 0, 1.0, True, 0.91, 7/255, 1.0, True)
+	merged = Levels(merged, RED, 0, 1.0, True, 1.0, 9/255, 1.0, True)
+	merged = Levels(merged, GREEN, 0, 224/255, True, 1.0, 3/255, 1.0, True)
+	merged = Levels(merged, BLUE, 0, 1.0, True, 0.94, 18/255, 1.0, True)
+	merged = BrightnessContrast(merged, -4/100, -15/100)
+
+	merged[..., 3] *= 0.40
+
+	return Composite(merged, ColorLayer(w, h, 0.99, 0.830, 0.480), MULTIPLY, 35)
+
+def BrannanLayers(src, spatial, frame=None):
+	return []
+
+def EarlybirdColor(src):
+	h, w = src.shape[:2]
+
+	out = HueSaturation(src, 0, 1, -30)
+	out = Levels(out, VALUE, 0, 1.0, True, 1.2, 0, 1.0, True)
+	out = Levels(out, RED, 0, 1.0, True, 1.0, 25/255, 1.0, True)
+	out = BrightnessContrast(out, 8/100, 20/100)
+
+	out = HueSaturation(out, 0, 0, -15)
+	out = Levels(out, VALUE, 0, 235/255, True, 0.9, 0, 1.0, True)
+
+	return Composite(out, ColorLayer(w, h, 1.0, 240/255, 205/255), MULTIPLY, 100)
+
+def EarlybirdLayers(src, spatial, frame=None):
+	w, h, y0, rows = Extent(src, frame)
+	if not spatial:
+		return []
+
+	return [Layer('Vignette', Vignette(w, h, STANDARD, 0.722, 0.722, 0.722, y0, rows), NORMAL, 6, None)]
+
+def GothamColor(src):
+	layer2 = CurvesSpline(src, BLUE, [0, 0, 63/255, 98/255, 128/255, 128/255, 189/255, 159/255, 1.0, 1.0])
+
+	return Composite(Desaturate(src, LIGHTNESS), layer2, HARDLIGHT, 100)
+
+def GothamLayers(src, spatial, frame=None):
+	w, h, y0, rows = Extent(src, frame)
+	if not spatial:
+		return []
+
+	#the blur is horizontal, so each strip only needs its own rows. Strips get their own noise seed. On a reduced
+	#copy the blur is shortened and the noise weakened as averaging the full size pixels down would.
+	scale = FrameScale(frame)
+	blur = DraftMotionBlur(src, 256 * scale, FrameDraft(frame))
+	return [Layer('Layer 3', Noise(blur, 0.10 * scale, y0), SCREEN, 75, None)]
+
+def InkwellColor(src):
+	out = Desaturate(src, LIGHTNESS)
+	out = CurvesSpline(out, VALUE, [0.0, 0.0, 0.051, 0.0, 0.325, 0.490, 0.698, 0.859, 1.0, 1.0])
+
+	return BrightnessContrast(out, -0.15, 0.15)
+
+def InkwellLayers(src, spatial, frame=None):
+	return []
+
+def LordKelvinColor(src):
+	out = CurvesSpline(src, VALUE, [10/255, 0, 1.0, 1.0])
+	out = CurvesSpline(out, RED, [0, 63/255, 100/255, 200/255, 1.0, 1.0])
+	out = CurvesSpline(out, GREEN, [0, 30/255, 180/255, 190/255, 1.0, 210/255])
+
+	return CurvesSpline(out, BLUE, [0, 90/255, 177/255, 114/255, 1.0, 188/255])
+
+def LordKelvinLayers(src, spatial, frame=None):
+	return []
+
+def PoprocketColor(src):
+	return src
+
+def PoprocketLayers(src, spatial, frame=None):
+	w, h, y0, rows = Extent(src, frame)
+	if not spatial:
+		return []
+
+	centerX, centerY = w / 2, h / 2
+	color1 = Paint(EmptyLayer(w, rows), RadialGradient(w, rows, centerX, centerY, 0.95 * w, centerY, 0.900, 0.153, 0.274, y0=y0))
+	color1 = ColorToAlpha(color1, 0.0, 1.0)
+	color2 = RadialGradient(w, rows, centerX, centerY, 1.50 * w, centerY, 0.059, 0.019, 0.180, reverse=True, y0=y0)
+	color2 = Paint(EmptyLayer(w, rows), color2, OVERLAY)
+
+	return [Layer('Vignette', color1, SCREEN, 100, None),
+			Layer('Vignette', color2, SOFTLIGHT, 100, None)]
+
+def RiseColor(src):
+	out = HueSaturation(src, 20, 0, -50)
+
+	return Levels(out, VALUE, 0, 1.0, True, 1.23, 0, 1.0, True)
+
+def RiseLayers(src, spatial, frame=None):
+	w, h, y0, rows = Extent(src, frame)
+	layers = []
+
+	if spatial:
+		#the gradient is painted over the vignette in overlay mode, so both end up in one layer
+		vignette = Vignette(w, h, OBLATE, y0=y0, rows=rows)
+		vignette = Paint(vignette, RadialGradient(w, rows, w / 2, h / 2, 1.50 * w, h / 2, 0, 0, 0, y0=y0), OVERLAY)
+		layers.append(Layer('Vignette', vignette, OVERLAY, 100, None))
+		layers.append(Layer('Noise', Noise(ColorLayer(w, rows, 0, 0, 0), 0.10 * FrameScale(frame), y0), SCREEN, 20, None))
+
+	layers.append(Layer('Color', ColorLayer(w, rows, 0.929, 0.541, 0), OVERLAY, 50, None))
+
+	return layers
+
+def ToasterColor(src):
+	return src
+
+def ToasterLayers(src, spatial, frame=None):
+	w, h, y0, rows = Extent(src, frame)
+	layers = []
+
+	#layer 2 is masked outside the standard ellipse
+	layer2 = CurvesSpline(src, VALUE, [25/255, 0, 1.0, 1.0])
+	layers.append(Layer('Layer 2', layer2, NORMAL, 100, 1.0 - MaskOrCenter(w, h, STANDARD, spatial, y0, rows)))
+
+	if spatial:
+		gradient = LinearGradient(w, rows, 0, h / 2, w, h / 2, (0.227, 0.040, 0.349), (0.995, 0.663, 0.341), bilinear=True, y0=y0)
+		layers.append(Layer('Gradient', Composite(src, gradient, NORMAL, 30), NORMAL, 70, None))
+
+	large = MaskOrCenter(w, h, LARGE, spatial, y0, rows)
+	layers.append(Layer('Layer 3', ColorLayer(w, rows, 0.114, 0.114, 0.114), SCREEN, 35, large))
+	layers.append(Layer('Color', ColorLayer(w, rows, 0.823, 0.6, 0.003), DODGE, 1, large))
+
+	return layers
+
+def ValenciaColor(src):
+	h, w = src.shape[:2]
+
+	out = Composite(src, ColorLayer(w, h, 0.965, 0.867, 0.678), MULTIPLY, 100)
+	out = CurvesSpline(out, VALUE, [0, 50/255, 75/255, 110/255, 175/255, 220/255, 1.0, 1.0])
+	out = Levels(out, BLUE, 0, 1.0, True, 1.0, 126/255, 1.0, True)
+
+	return ColorToAlpha(out, 0.0, 0.78)
+
+def ValenciaLayers(src, spatial, frame=None):
+	return []
+
+def WaldenColor(src):
+	out = CurvesSpline(src, VALUE, [12/255, 0, 1.0, 1.0])
+	out = CurvesSpline(out, RED, [10/255, 0, 247/255, 1.0])
+	out = CurvesSpline(out, BLUE, [0, 38/255, 1.0, 203/255])
+
+	out = Levels(out, VALUE, 0, 235/255, True, 1.17, 55/255, 1.0, True)
+
+	return CurvesSpline(out, VALUE, [41/255, 0, 125/255, 124/255, 1.0, 1.0])
+
+def WaldenLayers(src, spatial, frame=None):
+	w, h, y0, rows = Extent(src, frame)
+	if not spatial:
+		return []
+
+	gradient = Paint(EmptyLayer(w, rows), RadialGradient(w, rows, 0, 0, w / 2, h / 2, 1.0, 1.0, 1.0, y0=y0), SOFTLIGHT)
+
+	return [Layer('Gradient', gradient, SOFTLIGHT, 80, None)]
+
+#color and layer functions for each identifier in effectsList
+effectFunctions = {
+	"AMARO": (AmaroColor, AmaroLayers),
+	"APOLLO": (ApolloColor, ApolloLayers),
+	"BRANNAN": (BrannanColor, BrannanLayers),
+	"EARLYBIRD": (EarlybirdColor, EarlybirdLayers),
+	"GOTHAM": (GothamColor, GothamLayers),
+	"INKWELL": (InkwellColor, InkwellLayers),
+	"LORDKELVIN": (LordKelvinColor, LordKelvinLayers),
+	"POPROCKET": (PoprocketColor, PoprocketLayers),
+	"RISE": (RiseColor, RiseLayers),
+	"TOASTER": (ToasterColor, ToasterLayers),
+	"VALENCIA": (ValenciaColor, ValenciaLayers),
+	"WALDEN": (WaldenColor, WaldenLayers)
+}
+
+#spatial parts of each effect that are left out when spatial is False
+spatialParts = {
+	"AMARO": ["standard vignette"],
+	"APOLLO": ["large vignette"],
+	"BRANNAN": [],
+	"EARLYBIRD": ["standard vignette"],
+	"GOTHAM": ["motion blur", "noise"],
+	"INKWELL": [],
+	"LORDKELVIN": [],
+	"POPROCKET": ["screen radial gradient", "soft light radial gradient"],
+	"RISE": ["oblate vignette", "radial gradient", "noise"],
+	"TOASTER": ["bilinear gradient", "standard vignette mask (center value used)", "large vignette masks (center value used)"],
+	"VALENCIA": [],
+	"WALDEN": ["radial gradient"]
+}
+
+#composites an effect group over the source pixels
+def Finish(src, base, layers):
+	for layer in layers:
+		base = Composite(base, layer.pixels, layer.mode, layer.opacity, layer.mask)
+
+	return Composite(src, base)
+
+#applies an effect to an RGB(A) array and returns an array of the same type and shape. The array may be a strip
+#of rows of a larger image, given by a Frame, and is then rendered as that part of the whole image. Only the
+#noise differs, since each strip is seeded by its first row.
+def Apply(pixels, effect, spatial=True, frame=None):
+	if effect not in effectFunctions:
+		raise ValueError(f"Unknown effect {effect}")
+
+	color, layers = effectFunctions[effect]
+	src = ToFloat(pixels)
+
+	return FromFloat(Finish(src, color(src), layers(src, spatial, frame)), pixels)
+
+#
+# --- Multi-core strips ---
+#
+
+#returns the rows in each strip of an image of the given width
+def StripRows(w):
+	return max(1, stripBytes // (w * 16))
+
+#applies an effect like Apply, splitting the pixels into cache sized strips that each run the whole chain on a
+#pool of threads. NumPy releases the GIL inside its operations, so the strips run on separate cores. The pixels
+#may themselves be a strip of a larger image given by a Frame.
+def ApplyParallel(pixels, effect, spatial=True, frame=None, workers=None, rows=None):
+	pixels = np.asarray(pixels)
+	h, w = pixels.shape[:2]
+	frame = frame or Frame(w, h, 0)
+	rows = rows or StripRows(w)
+	workers = workers or os.cpu_count() or 1
+	out = np.empty_like(pixels)
+
+	def run(y0):
+		y1 = min(h, y0 + rows)
+		out[y0:y1] = Apply(pixels[y0:y1], effect, spatial, frame._replace(y0=frame.y0 + y0))
+
+	if workers == 1:
+		for y0 in range(0, h, rows):
+			run(y0)
+	else:
+		with ThreadPoolExecutor(max_workers=workers) as pool:
+			list(pool.map(run, range(0, h, rows)))
+
+	return out
+
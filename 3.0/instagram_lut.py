@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+'''
+Baked 3D lookup tables for the headless Instagram engine. The per-pixel color section of an effect is sampled
+once on a regular RGB lattice and kept in an on-disk cache keyed by effect, a digest of that color section and
+lattice size. Later runs replace the chain of levels, curves and other color operations with a single trilinear
+or tetrahedral lookup, then composite the spatial layers of the effect as usual. Lattice samples are taken
+from opaque colors, so the alpha produced by the lookup is multiplied with the alpha of the source.
+
+The per-pixel color portion of every effect can also be exported as .cube files and Hald CLUT images for
+tools such as ffmpeg's lut3d/haldclut filters and libvips:
+
+    python3 instagram_lut.py OUTPUT_DIR [--size 33] [--hald-level 8] [EFFECT ...]
+'''
+
+import os, sys, zlib, struct, argparse
+import numpy as np
+from instagram_curves import pluginVersion
+from instagram_engine import effectFunctions, spatialParts, Apply as ApplyEffect, ToFloat, FromFloat, Finish
+
+#lattice sizes that are supported for baking
+lutSizes = (17, 33, 65)
+
+#lattice size used for lookups when none is given. Against the full chain, 8 bit outputs differ by up to 9 levels
+#at 33 points and 3 at 65.
+defaultSize = 65
+
+#points along each axis of the lattice whose colors are digested to tell one definition of an effect from another
+digestSize = 5
+
+#pixels looked up per chunk, which bounds the memory used for the corner gathers
+chunkPixels = 1 << 16
+
+#LUTs already loaded in this process
+loadedLuts = {}
+
+#returns the directory for cached LUTs, which can be changed with INSTAGRAM_LUT_CACHE
+def CacheDir():
+	default = os.path.join(os.path.expanduser('~'), '.cache', 'gimp_instagram')
+	return os.environ.get('INSTAGRAM_LUT_CACHE', default)
+
+#returns a digest of the color section of an effect, taken from its output for a small lattice of colors, so a
+#change to the curves, levels or any other operation of the effect gives a new cache file
+def Digest(effect):
+	color, _ = effectFunctions[effect]
+	values = np.ascontiguousarray(color(Lattice(digestSize)), dtype=np.float32)
+
+	return f"{zlib.crc32(values.tobytes()):08x}"
+
+def CachePath(effect, size):
+	return os.path.join(CacheDir(), f"{effect}-{Digest(effect)}-{size}.npy")
+
+#returns the lattice of RGBA colors sampled for a LUT, ordered with red varying slowest
+def Lattice(size):
+	axis = np.linspace(0.0, 1.0, size, dtype=np.float32)
+	r, g, b = np.meshgrid(axis, axis, axis, indexing='ij')
+	lattice = np.stack([r, g, b, np.ones_like(r)], axis=-1)
+
+	return lattice.reshape(size * size, size, 4)
+
+#samples the color section of an effect into a (size, size, size, 4) LUT indexed by [r, g, b]
+def Bake(effect, size=defaultSize):
+	if effect not in effectFunctions:
+		raise ValueError(f"Unknown effect {effect}")
+	if size not in lutSizes:
+		raise ValueError(f"LUT size must be one of {lutSizes}")
+
+	color, _ = effectFunctions[effect]
+	values = color(Lattice(size))
+
+	return np.ascontiguousarray(values.reshape(size, size, size, 4), dtype=np.float32)
+
+#returns the LUT for an effect from memory or the disk cache, baking and saving it when missing
+def LoadLUT(effect, size=defaultSize):
+	key = (effect, size)
+	if key in loadedLuts:
+		return loadedLuts[key]
+
+	path = CachePath(effect, size)
+	lut = None
+	if os.path.exists(path):
+		try:
+			lut = np.load(path)
+		except (OSError, ValueError):
+			lut = None
+
+		if lut is not None and lut.shape != (size, size, size, 4):
+			lut = None
+
+	if lut is None:
+		lut = Bake(effect, size)
+
+		#write to a temporary file first so concurrent runs never read a partial LUT
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		temp = f"{path}.{os.getpid()}.tmp"
+		with open(temp, 'wb') as f:
+			np.save(f, lut)
+		os.replace(temp, path)
+
+	loadedLuts[key] = lut
+	return lut
+
+#trilinear interpolation of the eight lattice corners around each color, using a flattened LUT
+def Trilinear(lut, rgb):
+	n = lut.shape[0]
+	flat = lut.reshape(-1, 4)
+	pos = np.clip(rgb, 0.0, 1.0) * (n - 1)
+	i = np.minimum(pos.astype(np.int32), n - 2)
+	f = pos - i
+
+	base = (i[:, 0] * n + i[:, 1]) * n + i[:, 2]
+	fr, fg, fb = f[:, 0:1], f[:, 1:2], f[:, 2:3]
+	dr, dg = n * n, n
+
+	c0 = flat[base] * (1 - fb) + flat[base + 1] * fb
+	c1 = flat[base + dg] * (1 - fb) + flat[base + dg + 1] * fb
+	c2 = flat[base + dr] * (1 - fb) + flat[base + dr + 1] * fb
+	c3 = flat[base + dr + dg] * (1 - fb) + flat[base + dr + dg + 1] * fb
+
+	c0 = c0 * (1 - fg) + c1 * fg
+	c2 = c2 * (1 - fg) + c3 * fg
+
+	return c0 * (1 - fr) + c2 * fr
+
+#tetrahedral interpolation, which uses four corners chosen by the order of the fractional parts
+def Tetrahedral(lut, rgb):
+	n = lut.shape[0]
+	pos = np.clip(rgb, 0.0, 1.0) * (n - 1)
+	i = np.minimum(pos.astype(np.int32), n - 2)
+	f = pos - i
+
+	r, g, b = i[:, 0], i[:, 1], i[:, 2]
+	fr, fg, fb = f[:, 0:1], f[:, 1:2], f[:, 2:3]
+
+	c000 = lut[r, g, b]
+	c111 = lut[r + 1, g + 1, b + 1]
+	c100 = lut[r + 1, g, b]
+	c010 = lut[r, g + 1, b]
+	c001 = lut[r, g, b + 1]
+	c110 = lut[r + 1, g + 1, b]
+	c101 = lut[r + 1, g, b + 1]
+	c011 = lut[r, g + 1, b + 1]
+
+	#each branch walks from c000 to c111 along the edges of one tetrahedron
+	out = np.where(fr >= fg,
+				   np.where(fg >= fb,
+							c000 + fr * (c100 - c000) + fg * (c110 - c100) + fb * (c111 - c110),
+							np.where(fr >= fb,
+									 c000 + fr * (c100 - c000) + fb * (c101 - c100) + fg * (c111 - c101),
+									 c000 + fb * (c001 - c000) + fr * (c101 - c001) + fg * (c111 - c101))),
+				   np.where(fb >= fg,
+							c000 + fb * (c001 - c000) + fg * (c011 - c001) + fr * (c111 - c011),
+							np.where(fb >= fr,
+									 c000 + fg * (c010 - c000) + fb * (c011 - c010) + fr * (c111 - c011),
+									 c000 + fg * (c010 - c000) + fr * (c110 - c010) + fb * (c111 - c110))))
+
+	return out
+
+#looks up RGBA float pixels in a LUT, chunk by chunk
+def ApplyLUT(pixels, lut, tetrahedral=False):
+	lookup = Tetrahedral if tetrahedral else Trilinear
+	flat = pixels.reshape(-1, pixels.shape[-1])
+	out = np.empty((flat.shape[0], 4), np.float32)
+
+	for start in range(0, flat.shape[0], chunkPixels):
+		chunk = flat[start:start + chunkPixels]
+		values = lookup(lut, chunk[:, :3])
+		values[:, 3] *= chunk[:, 3]
+		out[start:start + chunkPixels] = values
+
+	return out.reshape(pixels.shape[:-1] + (4,))
+
+#applies an effect with its color section replaced by a cached LUT lookup. A strip of a larger image is
+#described by a Frame, as with instagram_engine.Apply.
+def Apply(pixels, effect, size=defaultSize, spatial=True, tetrahedral=False, frame=None):
+	if effect not in effectFunctions:
+		raise ValueError(f"Unknown effect {effect}")
+
+	_, layers = effectFunctions[effect]
+	src = ToFloat(pixels)
+	base = ApplyLUT(src, LoadLUT(effect, size), tetrahedral)
+
+	return FromFloat(Finish(src, base, layers(src, spatial, frame)), pixels)
+
+#
+# --- Export to .cube and Hald CLUT files ---
+#
+
+#returns RGB colors of an identity lattice with red varying fastest, as used by .cube files and Hald CLUTs
+def IdentityColors(size):
+	axis = np.linspace(0.0, 1.0, size, dtype=np.float32)
+	b, g, r = np.meshgrid(axis, axis, axis, indexing='ij')
+
+	return np.stack([r, g, b], axis=-1).reshape(-1, 3)
+
+#maps lattice colors through the per-pixel portion of an effect, with its spatial parts left out
+def ExportColors(effect, size):
+	colors = IdentityColors(size).reshape(size * size, size, 3)
+	return ApplyEffect(colors, effect, spatial=False).reshape(-1, 3)
+
+def WriteCube(path, effect, size=33):
+	colors = ExportColors(effect, size)
+	with open(path, 'w') as f:
+		f.write(f'TITLE "Instagram {effect} {pluginVersion}"\n')
+		f.write(f"LUT_3D_SIZE {size}\n")
+		f.write("DOMAIN_MIN 0.0 0.0 0.0\n")
+		f.write("DOMAIN_MAX 1.0 1.0 1.0\n")
+		for r, g, b in colors:
+			f.write(f"{r:.6f} {g:.6f} {b:.6f}\n")
+
+#writes a 16 bit RGB PNG using only the standard library
+def WritePNG(path, rgb):
+	h, w = rgb.shape[:2]
+	data = np.rint(np.clip(rgb, 0.0, 1.0) * 65535).astype('>u2')
+	rows = b''.join(b'\x00' + data[y].tobytes() for y in range(h))
+
+	def chunk(tag, body):
+		return struct.pack('>I', len(body)) + tag + body + struct.pack('>I', zlib.crc32(tag + body) & 0xffffffff)
+
+	with open(path, 'wb') as f:
+		f.write(b'\x89PNG\r\n\x1a\n')
+		f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 16, 2, 0, 0, 0)))
+		f.write(chunk(b'IDAT', zlib.compress(rows, 6)))
+		f.write(chunk(b'IEND', b''))
+
+#writes a Hald CLUT image of the given level, which holds a level^2 lattice in a level^3 square image
+def WriteHald(path, effect, level=8):
+	size = level * level
+	colors = ExportColors(effect, size)
+	WritePNG(path, colors.reshape(level ** 3, level ** 3, 3))
+
+#exports the effects and returns report lines listing the spatial parts left out of each one
+def Export(outdir, effects, size=33, level=8):
+	os.makedirs(outdir, exist_ok=True)
+	report = []
+	for effect in effects:
+		if effect not in effectFunctions:
+			raise ValueError(f"Unknown effect {effect}")
+
+		name = effect.lower()
+		WriteCube(os.path.join(outdir, name + ".cube"), effect, size)
+		WriteHald(os.path.join(outdir, name + "_hald.png"), effect, level)
+
+		omitted = ", ".join(spatialParts[effect]) or "nothing"
+		report.append(f"{effect}: {name}.cube, {name}_hald.png, left out: {omitted}")
+
+	with open(os.path.join(outdir, "report.txt"), 'w') as f:
+		f.write("\n".join(report) + "\n")
+
+	return report
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Export the per-pixel color portion of the Instagram effects as .cube and Hald CLUT files.")
+	parser.add_argument("outdir", help="directory for the exported files")
+	parser.add_argument("effects", nargs="*", default=list(effectFunctions), help="effect identifiers, defaults to all")
+	parser.add_argument("--size", type=int, default=33, help="lattice size of the .cube files")
+	parser.add_argument("--hald-level", type=int, default=8, help="level of the Hald CLUT images")
+	args = parser.parse_args(argv)
+
+	for line in Export(args.outdir, args.effects, args.size, args.hald_level):
+		print(line)
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
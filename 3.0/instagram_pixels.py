@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+'''
+Bulk pixel transfers between GIMP drawables and NumPy arrays for the GIMP 3 plugin. A rectangle of a drawable's GEGL
+buffer is read in one call, converted by babl to the format asked for, and the bytes GEGL returns are wrapped as an
+array without being copied again. Arrays are written back in one call as well, to the shadow buffer when the result
+should be merged as a single undo step. A kernel written with NumPy can so change a drawable in one pass, with no
+Python running per pixel, where PDB operations would take a round trip and a pass each.
+
+Writes hand GEGL one bytes object, since that is the form PyGObject passes without converting each value. Needs
+NumPy and the Gegl typelib, so the plugin imports this module only when it is used.
+'''
+
+import gi
+
+gi.require_version('Gegl', '0.4')
+
+from gi.repository import Gegl
+import numpy as np
+
+#non-linear RGBA floats, the space the curves and the headless engine work in
+defaultFormat = "R'G'B'A float"
+
+#rows read and written at a time by ApplyKernel
+kernelRows = 256
+
+#NumPy type of each babl component type
+componentTypes = {
+	'u8': np.uint8,
+	'u16': np.uint16,
+	'u32': np.uint32,
+	'half': np.float16,
+	'float': np.float32,
+	'double': np.float64
+}
+
+#components of each babl color model, named by its capital letters so linear, non-linear, perceptual and
+#premultiplied variants such as "RGBA", "R'G'B'A", "R~G~B~A" and "RaGaBaA" share an entry
+modelComponents = {'RGBA': 4, 'RGB': 3, 'YA': 2, 'Y': 1}
+
+#
+# --- Formats and rectangles ---
+#
+
+#returns the NumPy type and the number of components of a babl format name such as "R'G'B'A float"
+def FormatLayout(format):
+	model, _, type = format.rpartition(' ')
+	key = ''.join(c for c in model if c.isupper())
+	if type not in componentTypes or key not in modelComponents:
+		raise ValueError(f"Unsupported pixel format {format}")
+
+	return np.dtype(componentTypes[type]), modelComponents[key]
+
+#returns the rectangle (x, y, w, h) covering a whole drawable, in its own coordinates
+def Bounds(drawable):
+	return (0, 0, drawable.get_width(), drawable.get_height())
+
+#
+# --- Transfers ---
+#
+
+#reads a rectangle (x, y, w, h) of a buffer as a read-only (h, w, components) array. Below a scale of 1 the
+#rectangle is in scaled coordinates and GEGL reads from its mipmaps.
+def ReadBuffer(buffer, rect, format=defaultFormat, scale=1.0):
+	x, y, w, h = rect
+	dtype, components = FormatLayout(format)
+	data = buffer.get(Gegl.Rectangle.new(x, y, w, h), scale, format, Gegl.AbyssPolicy.CLAMP)
+
+	return np.frombuffer(data, dtype).reshape(h, w, components)
+
+#writes an (h, w, components) array to a buffer with its top left corner at (x, y)
+def WriteBuffer(buffer, pixels, x=0, y=0, format=defaultFormat):
+	dtype, components = FormatLayout(format)
+	h, w = pixels.shape[:2]
+	if pixels.size != w * h * components:
+		raise ValueError(f"An array of shape {pixels.shape} does not hold {format} pixels")
+
+	buffer.set(Gegl.Rectangle.new(x, y, w, h), format, np.ascontiguousarray(pixels, dtype).tobytes())
+
+#reads a rectangle of a drawable, or all of it
+def ReadPixels(drawable, rect=None, format=defaultFormat, scale=1.0):
+	return ReadBuffer(drawable.get_buffer(), rect or Bounds(drawable), format, scale)
+
+#writes an array to a drawable directly, which keeps no undo data, and updates the part that changed
+def WritePixels(drawable, pixels, x=0, y=0, format=defaultFormat):
+	buffer = drawable.get_buffer()
+	WriteBuffer(buffer, pixels, x, y, format)
+	buffer.flush()
+	drawable.update(x, y, pixels.shape[1], pixels.shape[0])
+
+#
+# --- Kernels ---
+#
+
+#runs kernel(pixels, y0) over a drawable one strip of rows at a time, where y0 is the top row of the strip, and
+#writes what it returns to the shadow buffer. The shadow is merged back at the end as one undo step. Report, if
+#given, is called with the number of rows after each strip; an exception raised there leaves the drawable as it was.
+def ApplyKernel(drawable, kernel, format=defaultFormat, rows=kernelRows, report=None):
+	w = drawable.get_width()
+	h = drawable.get_height()
+	buffer = drawable.get_buffer()
+	shadow = drawable.get_shadow_buffer()
+
+	for y0 in range(0, h, rows):
+		strip = ReadBuffer(buffer, (0, y0, w, min(rows, h - y0)), format)
+		WriteBuffer(shadow, kernel(strip, y0), 0, y0, format)
+		if report is not None:
+			report(len(strip))
+
+	shadow.flush()
+	drawable.merge_shadow(True)
+	drawable.update(0, 0, w, h)
@@ -0,0 +1,1342 @@
+#!/usr/bin/env python3
+
+'''
+A complex GIMP 3 plugin that attempts to replicate the original Instagram effects. The plugin
+is based on the original suite of GIMP plugins by Mario Crippa, 2013. Some simplifications and updates have been made
+and the individual effects have been consolidated into a single plugin. After migrations across
+different versions of GIMP, the effects have evolved away from the originals. GIMP starts the plugin through
+gimp_instagram.py.
+'''
+
+import os, zlib, gi
+
+gi.require_version("Gimp", "3.0")
+
+from gi.repository import Gimp, GLib, GObject
+from collections import namedtuple
+from instagram_curves import CurveChain, FastSRGBLuts
+from instagram_trace import Traced
+import instagram_trace
+
+#
+# --- Set up names for effects---
+#
+
+effectsList = [
+    ("AMARO", "Amaro"),
+    ("APOLLO", "Apollo"),
+    ("BRANNAN", "Brannan"),
+    ("EARLYBIRD", "Earlybird"),
+    ("GOTHAM", "Gotham"),
+    ("INKWELL", "Inkwell"),
+    ("LORDKELVIN", "Lord Kelvin"),
+    ("POPROCKET", "Poprocket"),
+    ("RISE", "Rise"),
+    ("TOASTER", "Toaster"),
+    ("VALENCIA", "Valencia"),
+    ("WALDEN", "Walden")
+]
+
+# Choice between building the effect from editable layers and rendering it into a single layer
+outputsList = [
+	("LAYERS", "Layer stack", "Build the effect from layers that can be edited by hand"),
+	("FLAT", "Single layer", "Render the whole effect into one layer in a single tiled pass")
+]
+
+qualitiesList = [
+	("FULL", "Full", "Run every filter at full resolution"),
+	("QUARTER", "Draft (1/4)", "Run the motion blur on rows reduced to a quarter of their width"),
+	("EIGHTH", "Draft (1/8)", "Run the motion blur on rows reduced to an eighth of their width")
+]
+
+# Create a Gimp.Choice from (identifier, label, description) triples, as this is the preferred way to access the
+# values in a dialog. Identifier, index, label and description must be present.
+def CreateChoice(items):
+	choice = Gimp.Choice.new()
+	for index, (identifier, label, description) in enumerate(items):
+		choice.add(identifier, index, label, description)
+
+	return choice
+
+#factor the smooth spatial filters are reduced by for each quality
+draftFactors = {"FULL": 1, "QUARTER": 4, "EIGHTH": 8}
+
+#
+# --- Deferred setup ---
+#
+
+#GIMP starts the plugin at every launch only to query its procedures, so GEGL and the UI libraries are loaded and
+#set up on first use instead of at import, and only once per process
+Gegl = None
+GimpUi = None
+
+#loads and initializes GEGL, which sets up babl as well
+def InitGegl():
+	global Gegl
+	if Gegl is None:
+		gi.require_version('Gegl', '0.4')
+		from gi.repository import Gegl as module
+		module.init(None)
+		Gegl = module
+
+	return Gegl
+
+#loads and initializes the GIMP UI library for dialogs
+def InitUi():
+	global GimpUi
+	if GimpUi is None:
+		gi.require_version('GimpUi', '3.0')
+		from gi.repository import GimpUi as module
+		module.init('instagram')
+		GimpUi = module
+
+	return GimpUi
+
+#tells whether NumPy, which the headless engine needs, can be imported, without importing it
+def HasNumPy():
+	from importlib.util import find_spec
+	return find_spec('numpy') is not None
+
+#
+# --- Set up names and descriptive labels for layers and vignettes ---
+#
+
+def CreateOptions(name, pairs):
+    symbols = [s for s, _ in pairs]
+    labels = [l for _, l in pairs]
+    labelTuples = [(l, i) for i, (_, l) in enumerate(pairs)]
+    reverse = {l: i for i, (_, l) in enumerate(pairs)}
+
+    optsclass = namedtuple(name + 'Type',
+                           symbols + ['labels', 'labelTuples', 'reverse'])
+
+    return optsclass(*(list(range(len(pairs))) + [labels, labelTuples, reverse]))
+
+Layers = CreateOptions('Layers',
+					   [('LAYER1', 'Layer 1'),
+		 				('LAYER2', 'Layer 2'),
+						('LAYER3', 'Layer 3'),
+						('VIGNETTE','Vignette'),
+						('COLOR', 'Color'),
+						('NOISE', 'Noise'),
+						('BW', 'Black and White'),
+						('GRADIENT', 'Gradient'),
+						('MASK', 'Mask'),
+						('MERGED', 'Merged')
+])
+
+Vignettes = CreateOptions('Vignettes',
+						  [('STANDARD', 'Fits inside the image'),
+							('LARGE', 'Extends outside the image'),
+							('OBLATE', 'Flattened'),
+							('NONE', 'Defaults to an empty layer')
+])
+
+#
+# --- Effect recipes ---
+#
+
+#what the steps of a recipe work on: the images, the layers and filters made so far by handle, and the size of
+#the region the effect is built in
+Canvas = namedtuple('Canvas', ['image', 'drawable', 'layerGroup', 'layers', 'filters', 'w', 'h'])
+
+#
+# --- Vignette mask cache ---
+#
+
+#feathered vignettes and masks are drawn once on a small proxy and kept as named buffers for the rest of the GIMP
+#session, so later uses paste and scale them instead of feathering a selection at full size. Images with the same
+#aspect ratio share them. Least recently used ones are deleted over the cap.
+vignettePrefix = "instagram-vignette"
+vignetteCacheBytes = int(float(os.environ.get('INSTAGRAM_VIGNETTE_CACHE_MB', 64)) * (1 << 20))
+
+#longest side of the proxy image a vignette is drawn on before it is scaled up
+vignetteProxy = 512
+
+#
+# --- Kept looks ---
+#
+
+#parasite that marks an effect group kept for switching back to it, holding the effect and the layers it was built from
+lookParasite = "instagram-look"
+
+#parasites hold their values as JSON. The json module is imported on first use, since a query reads none of them.
+def ParasiteValue(parasite):
+	import json
+	return json.loads(bytes(parasite.get_data()).decode())
+
+def ParasiteData(value):
+	import json
+	return list(json.dumps(value).encode())
+
+#size of the previews of each visible drawable whose checksums tell whether its pixels have changed
+checksumPreviewSize = 256
+
+#
+# --- Visible image snapshot ---
+#
+
+#parasite that marks the hidden layer holding a copy of the visible image, with what the image was made of when it
+#was taken. Later effects copy it instead of compositing the visible image again while that is unchanged.
+snapshotParasite = "instagram-snapshot"
+snapshotName = "Instagram Snapshot"
+
+#
+# --- Single layer output ---
+#
+
+#pixel format and strip height used to stream a layer through the headless engine
+flatFormat = "R'G'B'A float"
+flatStripRows = 256
+
+#
+# --- Progress and cancellation ---
+#
+
+#global parasite the instagram-cancel procedure attaches to ask a running effect to stop after its current step
+cancelParasite = "instagram-cancel"
+
+#predicted cost, in full-image passes, of copying the visible image in, of adding the finished group to the image
+#and of rendering a whole effect into a single layer
+baseCost = 2
+finishCost = 2
+flatCost = 16
+
+#raised between steps when the effect being built has been cancelled
+class Cancelled(Exception):
+	pass
+
+#
+# --- Live preview ---
+#
+
+#longest side of the preview shown in the dialog
+previewSize = 400
+
+#
+# --- Contact sheet of all effects ---
+#
+
+#columns of previews, space around them in pixels, height of the label under each and the sheet color
+sheetColumns = 4
+sheetMargin = 16
+sheetLabel = 28
+sheetBackground = 0.18
+
+#size in pixels and the two shades of the checks shown through transparent parts of a preview, as GIMP shows them
+sheetCheckSize = 8
+sheetChecks = (0.4, 0.6)
+
+class Instagram(Gimp.PlugIn):
+	def do_query_procedures(self):
+		return ["instagram", "instagram-preview-all", "instagram-cancel"]
+
+	def do_create_procedure(self, name):
+		if name == "instagram-preview-all":
+			return self.CreatePreviewProcedure(name)
+		elif name == "instagram-cancel":
+			return self.CreateCancelProcedure(name)
+
+		proc = Gimp.ImageProcedure.new(
+            self,
+            name,
+            Gimp.PDBProcType.PLUGIN,
+            self.run,
+            None
+        )
+		proc.set_image_types("*")
+		proc.set_menu_label("Instagram")
+		proc.add_menu_path("<Image>/Filters/Simon")
+		proc.set_documentation("Adds the selected Instagram effect",
+                            	"Applies the selected Instagram filter effect to the entire visible image.",
+                                name)
+		proc.set_attribution("Simon Bland", "copyright Simon Bland", "2025")
+
+		proc.add_choice_argument("effect",
+						   		"Effect type",
+								"The Instagram style effect to be applied to the image.",
+								CreateChoice([(e, l, f"Apply the {l} effect") for e, l in effectsList]),
+								"AMARO",
+								GObject.ParamFlags.READWRITE)
+
+		proc.add_double_argument("strength",
+								 "Strength",
+								 "Opacity of the effect group, in percent.",
+								 0.0, 100.0, 100.0,
+								 GObject.ParamFlags.READWRITE)
+
+		proc.add_choice_argument("output",
+								 "Output",
+								 "Build the effect as a layer stack, or render it into a single layer.",
+								 CreateChoice(outputsList),
+								 "LAYERS",
+								 GObject.ParamFlags.READWRITE)
+
+		proc.add_choice_argument("quality",
+								"Quality",
+								"Draft qualities run smooth spatial filters at a reduced size.",
+								CreateChoice(qualitiesList),
+								"FULL",
+								GObject.ParamFlags.READWRITE)
+
+		proc.add_boolean_argument("procedural-fills",
+								  "Procedural color fills",
+								  "Apply solid color layers as blend filters instead of full size layers.",
+								  False,
+								  GObject.ParamFlags.READWRITE)
+
+		proc.add_boolean_argument("selection-only",
+								  "Selection only",
+								  "Build the effect in the bounds of the selection and mask it with the selection.",
+								  False,
+								  GObject.ParamFlags.READWRITE)
+
+		proc.add_boolean_argument("lightweight-undo",
+								  "Lightweight undo",
+								  "Build the effect without undo and add the finished group as a single undo step.",
+								  False,
+								  GObject.ParamFlags.READWRITE)
+
+		proc.add_boolean_argument("keep-looks",
+								  "Keep looks",
+								  "Keep each effect group hidden in the image, so switching back to an effect only shows it again.",
+								  False,
+								  GObject.ParamFlags.READWRITE)
+
+		proc.add_boolean_argument("reuse-snapshot",
+								  "Reuse snapshot",
+								  "Keep a hidden copy of the visible image and build later effects from it while the layers are unchanged.",
+								  False,
+								  GObject.ParamFlags.READWRITE)
+		return proc
+
+	#creates the procedure that renders every effect on a reduced copy of the visible image, side by side
+	def CreatePreviewProcedure(self, name):
+		proc = Gimp.ImageProcedure.new(
+            self,
+            name,
+            Gimp.PDBProcType.PLUGIN,
+            self.RunPreview,
+            None
+        )
+		proc.set_image_types("*")
+		proc.set_menu_label("Instagram Preview All")
+		proc.add_menu_path("<Image>/Filters/Simon")
+		proc.set_documentation("Previews all Instagram effects",
+                            	"Renders every Instagram effect on a reduced copy of the visible image and shows them in a contact sheet.",
+                                name)
+		proc.set_attribution("Simon Bland", "copyright Simon Bland", "2025")
+
+		proc.add_int_argument("proxy-size",
+							  "Preview size",
+							  "Longest side of each preview in pixels.",
+							  64, 1024, 320,
+							  GObject.ParamFlags.READWRITE)
+
+		proc.add_image_return_value("sheet",
+									"Contact sheet",
+									"The new image holding the previews.",
+									False,
+									GObject.ParamFlags.READWRITE)
+		return proc
+
+	#creates the procedure that asks a running Instagram effect to stop and roll back
+	def CreateCancelProcedure(self, name):
+		proc = Gimp.Procedure.new(
+            self,
+            name,
+            Gimp.PDBProcType.PLUGIN,
+            self.RunCancel,
+            None
+        )
+		proc.set_menu_label("Instagram Cancel")
+		proc.add_menu_path("<Image>/Filters/Simon")
+		proc.set_documentation("Cancels a running Instagram effect",
+                            	"Asks the Instagram effect being built to stop after its current step and remove what it has built so far.",
+                                name)
+		proc.set_attribution("Simon Bland", "copyright Simon Bland", "2025")
+		return proc
+
+	#leaves the cancel request for the running effect to find between its steps
+	def RunCancel(self, procedure, config, data):
+		Gimp.attach_parasite(Gimp.Parasite.new(cancelParasite, 0, [1]))
+		return procedure.new_return_values(Gimp.PDBStatusType.SUCCESS, GLib.Error())
+
+	def run(self, procedure, run_mode, image, drawables, config, data):
+		
+		InitGegl()
+
+		# Drawable
+		drawable = drawables[0]
+
+	    # Show a dialog box to capture input parameters
+		if run_mode == Gimp.RunMode.INTERACTIVE:
+			InitUi()
+
+			dialog = GimpUi.ProcedureDialog(procedure=procedure, config=config)
+			dialog.fill(['effect', 'strength', 'output', 'quality', 'procedural-fills', 'selection-only', 'lightweight-undo', 'keep-looks', 'reuse-snapshot'])
+			preview = self.AddLivePreview(dialog, image, config)
+
+			accepted = dialog.run()
+			if preview is not None:
+				preview.Cancel()
+
+			if not accepted:
+				dialog.destroy()
+
+				return procedure.new_return_values(Gimp.PDBStatusType.CANCEL, None)
+			
+			else:
+				dialog.destroy()
+
+        # Get dialog variables
+		effect = config.get_property('effect')
+		strength = config.get_property('strength')
+		output = config.get_property('output')
+		self.draft = draftFactors[config.get_property('quality')]
+		self.proceduralFills = config.get_property('procedural-fills')
+		selectionOnly = config.get_property('selection-only') and not Gimp.Selection.is_empty(image)
+		lightweightUndo = config.get_property('lightweight-undo')
+		keepLooks = config.get_property('keep-looks')
+		self.reuseSnapshot = config.get_property('reuse-snapshot')
+
+		# Options that change what is built, which a kept look must have been built with to be shown again
+		settings = {'output': output, 'quality': config.get_property('quality'), 'procedural-fills': self.proceduralFills,
+					'lightweight-undo': lightweightUndo}
+
+		# Single layer output renders with the headless engine, so fail before touching the image without it
+		if output == "FLAT" and not HasNumPy():
+			return procedure.new_return_values(Gimp.PDBStatusType.EXECUTION_ERROR,
+											   GLib.Error("Single layer output needs NumPy in GIMP's Python"))
+
+		# Start an undo group so the whole operation is one step in history, and set
+        # foreground and background colors
+		image.undo_group_start()
+		Gimp.context_push()
+
+		# Nothing is built yet, and the image the effect goes into is the one it is built in
+		target = image
+		layerGroup = None
+		selection = None
+		try:
+			# Region the effect is built in, or None for the whole image
+			self.region = self.SelectionRegion(image) if selectionOnly else None
+
+			# Show a look already built from the same layers instead of building it again
+			if keepLooks and self.ShowLook(image, effect, strength, self.region, settings):
+				return procedure.new_return_values(Gimp.PDBStatusType.SUCCESS, GLib.Error())
+
+			#
+			# --- Base code used for all effects ---
+			#
+
+			# Plan the steps and predict their cost, which progress is weighted by
+			if output == "FLAT":
+				plan = None
+				total = baseCost + flatCost + finishCost
+			else:
+				#build the layers from the effect's recipe, optimized for the precision of the image
+				from instagram_recipes import recipes, Optimize, Cost
+				plan = Optimize(recipes[effect], self.PrecisionLevels(image))
+				total = baseCost + sum(Cost(step, self.draft) for step in plan) + finishCost
+
+			eName = dict(effectsList)[effect]
+			self.StartProgress(f"Instagram {eName}", total)
+
+			# With lightweight undo the effect is built in a scratch image that keeps no undo data
+			if lightweightUndo:
+				image = self.ScratchImage(target)
+
+			# Create group and a layer that acts as the base image for effects
+			groupName = eName + " Group"
+			layerGroup = Gimp.GroupLayer.new(image, groupName)
+
+			if instagram_trace.enabled:
+				instagram_trace.Begin(effect, image.get_width(), image.get_height())
+
+			Gimp.Image.insert_layer(image, layerGroup, None, 0)
+
+			layer1 = self.AddLayerFromVisible(target, image, layerGroup, Layers.LAYER1)
+
+			# Keep the selection to mask the group with once the effect is built
+			selection = Gimp.Selection.save(target) if selectionOnly else None
+
+			# Calculate image dimensions, the size of the selection bounds if any. Layers are moved to the bounds, and
+			# coordinates on them are relative to the layer.
+			Gimp.Selection.all(image)
+			sel_size = Gimp.Selection.bounds(image)
+			w = sel_size.x2 - sel_size.x1
+			h = sel_size.y2 - sel_size.y1
+			if self.region is not None:
+				_, _, w, h = self.region
+
+			self.Advance(baseCost)
+
+			#
+			# --- Individual effects ---
+			#
+
+			if output == "FLAT":
+				#render the whole effect into the base layer instead of building the layers
+				self.RenderFlat(layer1, effect, self.draft)
+			else:
+				self.RunRecipe(Canvas(image, drawable, layerGroup, {'base': layer1, 'group': layerGroup}, {}, w, h), plan)
+
+			# Add the finished group to the image as one undo step
+			if image is not target:
+				layerGroup = self.CopyGroup(image, target, layerGroup)
+				image = target
+
+			# Composite the effect back through the selection it was built for
+			if selection is not None:
+				image.select_item(Gimp.ChannelOps.REPLACE, selection)
+				self.AddMask(layerGroup, Gimp.AddMaskType.SELECTION)
+				image.remove_channel(selection)
+				selection = None
+
+			layerGroup.set_opacity(strength)
+			if keepLooks:
+				self.KeepLook(image, layerGroup, effect, settings)
+
+			Gimp.progress_update(1.0)
+
+		except Cancelled:
+			# Remove everything built so far and leave the image as it was
+			self.RollBack(target, image, layerGroup, selection)
+			return procedure.new_return_values(Gimp.PDBStatusType.CANCEL, GLib.Error())
+
+		except Exception:
+			# Leave the image as it was on any other error too, and let GIMP report it
+			self.RollBack(target, image, layerGroup, selection)
+			raise
+
+		finally:
+			# Restore context and close the undo group
+			Gimp.progress_end()
+			Gimp.displays_flush()
+			Gimp.context_pop()
+			target.undo_group_end()
+			instagram_trace.End()
+
+		return procedure.new_return_values(Gimp.PDBStatusType.SUCCESS, GLib.Error())	
+
+	#
+    # --- Methods invoking Gegl operations and PDB plugins ----
+    #
+
+	@Traced
+	def ColorToAlpha(self, layer, transpThresh = 0.0, opacityThresh = 1.0, r = 1.0, g = 1.0, b = 1.0):
+		# Add color for effect
+		fgColor = Gegl.Color.new('white')
+		fgColor.set_rgba(r, g, b, 0.0)
+
+		filter = Gimp.DrawableFilter.new(layer, "gegl:color-to-alpha", "Color to Alpha")
+		filter.set_blend_mode(Gimp.LayerMode.REPLACE)
+		filter.set_opacity(100)
+		config = filter.get_config()
+		config.set_property('color', fgColor)
+		config.set_property('transparency-threshold', transpThresh)
+		config.set_property('opacity-threshold', opacityThresh)
+		filter.update()
+		layer.append_filter(filter)
+		return
+
+	#adds a linear motion blur with default settings. In draft quality the blur runs along rows narrowed by the
+	#draft factor and is merged before the layer is widened again, leaving the vertical detail untouched.
+	@Traced
+	def AddMBlur(self, layer, draft = 1):
+		if draft > 1:
+			w = layer.get_width()
+			h = layer.get_height()
+			_, x, y = layer.get_offsets()
+			Gimp.context_set_interpolation(Gimp.InterpolationType.LOHALO)
+			layer.scale(max(1, w // draft), h, True)
+
+		# Adapted from pdb.plug_in_mblur(image, layer3, 0, 256, 0, 0, 0) where type (0=LINEAR)
+		filter = Gimp.DrawableFilter.new(layer, "gegl:motion-blur-linear", "Motion blur")
+		filter.set_blend_mode(Gimp.LayerMode.NORMAL)
+		filter.set_opacity(100)
+		config = filter.get_config()
+		config.set_property('length', 256 / draft)
+		config.set_property('angle', 0)
+		filter.update()
+		layer.append_filter(filter)
+
+		if draft > 1:
+			layer.merge_filters()
+			Gimp.context_set_interpolation(Gimp.InterpolationType.LINEAR)
+			layer.scale(w, h, True)
+			layer.set_offsets(x, y)
+		return
+
+	#adds a noise filter with default settings
+	@Traced
+	def AddNoise(self, layer):
+		# Adapted from:  pdb.plug_in_rgb_noise(image, layer3, 0, 1, 0.10, 0.10, 0.10, 0)
+		filter = Gimp.DrawableFilter.new(layer, "gegl:noise-rgb", "Noise RGB")
+		filter.set_blend_mode(Gimp.LayerMode.NORMAL)
+		filter.set_opacity(100)
+		config = filter.get_config()
+		config.set_property('correlated', False)
+		config.set_property('independent', False)
+		config.set_property('linear', True)
+		config.set_property('gaussian', True)
+		config.set_property('red', 0.10)
+		config.set_property('alpha', 0)
+		filter.update()
+		layer.append_filter(filter)
+		return
+
+    #
+    # --- Utility methods and functions ----
+    #
+
+	#renders a whole effect into a layer with the headless engine, one strip of rows at a time, split again into
+	#cache sized strips for all cores. Each strip is read from the layer's buffer and written to its shadow
+	#buffer, which is merged back in one step at the end.
+	@Traced
+	def RenderFlat(self, layer, effect, draft = 1):
+		from instagram_engine import ApplyParallel, Frame
+		from instagram_pixels import ApplyKernel
+
+		if not layer.has_alpha():
+			layer.add_alpha()
+
+		w = layer.get_width()
+		h = layer.get_height()
+		ApplyKernel(layer, lambda strip, y0: ApplyParallel(strip, effect, True, Frame(w, h, y0, 1.0, draft)), flatFormat, flatStripRows,
+					lambda rows: self.Advance(flatCost * rows / h))
+		layer.set_name(Layers.labels[Layers.MERGED])
+		return
+
+	#merges a layer down into the layer below it
+	@Traced
+	def MergeDown(self, image, layer):
+		return image.merge_down(layer, Gimp.MergeType.CLIP_TO_IMAGE)
+
+	#adjusts levels on a drawable
+	@Traced
+	def Levels(self, drawable, channel, lowInput, highInput, clampInput, gamma, lowOutput, highOutput, clampOutput):
+		drawable.levels(channel, lowInput, highInput, clampInput, gamma, lowOutput, highOutput, clampOutput)
+		return
+
+	#adds a solid color in selected mode. With procedural fills it becomes a filter on the target, which must hold
+	#everything the color layer would cover, so no full size layer is allocated and filled and None is returned.
+	def AddColor(self, image, name, layerGroup, target, w, h, opacity, mode, r, g, b):
+		if self.proceduralFills:
+			self.AddColorFilter(target, name, opacity, mode, r, g, b)
+			return None
+
+		return self.AddColorLayer(image, name, layerGroup, w, h, opacity, mode, r, g, b)
+
+	#adds a color overlay filter blended in selected mode, equivalent to a solid color layer above the drawable
+	@Traced
+	def AddColorFilter(self, drawable, name, opacity, mode, r, g, b):
+		color = Gegl.Color.new('black')
+		color.set_rgba(r, g, b, 1.0)
+
+		filter = Gimp.DrawableFilter.new(drawable, "gegl:color-overlay", Layers.labels[name])
+		filter.set_blend_mode(mode)
+		#filter opacity runs from 0 to 1, layer opacity from 0 to 100
+		filter.set_opacity(opacity / 100)
+		config = filter.get_config()
+		config.set_property('value', color)
+		filter.update()
+		drawable.append_filter(filter)
+		return
+
+	#adds a layer with solid color fill in selected mode
+	@Traced
+	def AddColorLayer(self, image, name, layerGroup, w, h, opacity, mode, r, g, b):
+		layer = self.AddLayer(image, layerGroup, w, h, name, opacity, mode)
+		self.AddFill(image, layer, mode, r, g, b)
+		
+		return layer
+
+	#adds a fill in specified mode and color (defaults to BLACK)
+	@Traced
+	def AddFill(self, image, layer, mode = Gimp.LayerMode.NORMAL, r = 0.0, g = 0.0, b = 0.0):
+		self.SetContexts(mode, False, r, g, b)
+		layer.edit_fill(Gimp.FillType.FOREGROUND)
+		Gimp.Selection.none(image)
+		return
+
+	#adds a new layer with transparent fill
+	@Traced
+	def AddLayer(self, image, layerGroup, w, h, name, opacity = 100, mode = Gimp.LayerMode.NORMAL):
+		layer = Gimp.Layer.new(image, Layers.labels[name], w, h, Gimp.ImageType.RGBA_IMAGE, opacity, mode)
+		if self.region is not None:
+			layer.set_offsets(self.region[0], self.region[1])
+		image.insert_layer(layer, layerGroup, 0)
+		layer.fill(Gimp.FillType.TRANSPARENT)
+		
+		return layer
+
+	#adds a new layer from the drawable in selected mode
+	@Traced
+	def AddLayerFromDrawable(self, drawable, image, layerGroup, name, mode = Gimp.LayerMode.NORMAL, desat = False, opacity = 100):
+		layer = Gimp.Layer.new_from_drawable(drawable, image)
+		image.insert_layer(layer, layerGroup, 0)
+		self.CropToRegion(layer)
+		layer.set_name(Layers.labels[name])
+		layer.set_mode(mode)
+		if desat == True:
+			layer.desaturate(Gimp.DesaturateMode.VALUE)
+		layer.set_opacity(opacity)
+
+		return layer
+
+	#adds a new layer from the visible source image. With snapshot reuse it is copied from the snapshot of the source,
+	#which is only taken again when the layers have changed.
+	@Traced
+	def AddLayerFromVisible(self, source, image, layerGroup, name):
+		snapshot = self.Snapshot(source, layerGroup) if self.reuseSnapshot else None
+		if snapshot is None:
+			layer = Gimp.Layer.new_from_visible(source, image, Layers.labels[name])
+		else:
+			layer = Gimp.Layer.new_from_drawable(snapshot, image)
+			layer.set_name(Layers.labels[name])
+			layer.set_visible(True)
+
+		image.insert_layer(layer, layerGroup, 0)
+		self.CropToRegion(layer)
+
+		return layer
+
+	#creates an image without undo to build an effect in, matching the size and format of the image it is for
+	def ScratchImage(self, image):
+		scratch = Gimp.Image.new_with_precision(image.get_width(), image.get_height(), image.get_base_type(), image.get_precision())
+		scratch.undo_disable()
+		scratch.set_color_profile(image.get_effective_color_profile())
+
+		return scratch
+
+	#moves a finished effect group from the scratch image it was built in to the image. Adding layers keeps no
+	#pixel data as undo, and each layer is removed from the scratch image once copied, so only one extra is alive.
+	#Filters left on the group by procedural fills are added to the new group.
+	@Traced
+	def CopyGroup(self, scratch, image, layerGroup):
+		group = Gimp.GroupLayer.new(image, layerGroup.get_name())
+		image.insert_layer(group, None, 0)
+
+		for layer in reversed(layerGroup.get_children()):
+			copy = Gimp.Layer.new_from_drawable(layer, image)
+			image.insert_layer(copy, group, 0)
+			scratch.remove_layer(layer)
+
+		for filter in layerGroup.get_filters():
+			self.CopyFilter(filter, group)
+
+		scratch.delete()
+		return group
+
+	#adds a filter with the operation, settings, blend mode and opacity of another one to a drawable
+	def CopyFilter(self, filter, drawable):
+		copy = Gimp.DrawableFilter.new(drawable, filter.get_operation_name(), filter.get_name())
+		copy.set_blend_mode(filter.get_blend_mode())
+		copy.set_opacity(filter.get_opacity())
+
+		config = filter.get_config()
+		copyConfig = copy.get_config()
+		for spec in config.list_properties():
+			copyConfig.set_property(spec.name, config.get_property(spec.name))
+
+		copy.update()
+		drawable.append_filter(copy)
+
+	#returns the bounds of the selection as (x, y, w, h)
+	def SelectionRegion(self, image):
+		bounds = Gimp.Selection.bounds(image)
+		return (bounds.x1, bounds.y1, bounds.x2 - bounds.x1, bounds.y2 - bounds.y1)
+
+	#crops a layer copied from the image to the region the effect is built in, if it is not the whole image
+	def CropToRegion(self, layer):
+		if self.region is None:
+			return
+
+		x, y, w, h = self.region
+		_, offsetX, offsetY = layer.get_offsets()
+		layer.resize(w, h, offsetX - x, offsetY - y)
+		return
+
+	#adds a layer mask - fill(0) is white, fill(1) is black
+	@Traced
+	def AddMask(self, layer, fill):
+		mask = layer.create_mask(fill)
+		layer.add_mask(mask)
+		
+		return mask
+	
+	#creates a vignette layer filled outside a feathered ellipse shape. Defaults to black vignette.
+	@Traced
+	def CreateVignette(self, image, layerGroup, w, h, type, opacity = 100, mode = Gimp.LayerMode.NORMAL, r = 0.0, g = 0.0, b = 0.0):
+		layer = self.AddLayer(image, layerGroup, w, h, Layers.VIGNETTE, opacity, mode)
+		image.set_selected_layers([layer, None])
+
+		if type == Vignettes.NONE:
+			return layer
+		else:
+			#paste the cached fill outside a feathered ellipse
+			self.PasteVignette(image, layer, w, h, type, mode, (r, g, b), None, True)
+			
+			return layer
+
+	#selects a feathered ellipse shape
+	@Traced
+	def SelectEllipse(self, image, w, h, type):
+		Gimp.Selection.none(image)
+		if type == Vignettes.STANDARD:
+			image.select_ellipse(Gimp.ChannelOps.ADD, 0, 0, w, h)
+		elif type == Vignettes.LARGE:
+			delta = 0.05 * w
+			image.select_ellipse(Gimp.ChannelOps.ADD, 0 - delta, 0 - delta, w + (delta * 2), h + (delta * 2))
+		elif type == Vignettes.OBLATE:
+			delta = w / 6
+			epsilon = 0.05 * h
+			image.select_ellipse(Gimp.ChannelOps.ADD, 0 - delta, 0 + epsilon, w + delta * 2, h - epsilon * 2)
+		else:
+			return
+		
+		#standardize the feather amount
+		feather = 0.20 * max(w, h)	
+		Gimp.Selection.feather(image, feather)
+		return
+
+	#
+	# --- Methods for running effect recipes ---
+	#
+
+	#runs the steps of a recipe plan in order, each through the method named after its type
+	def RunRecipe(self, canvas, plan):
+		from instagram_recipes import Cost
+		for step in plan:
+			getattr(self, 'Step' + type(step).__name__)(canvas, step)
+			self.Advance(Cost(step, self.draft))
+		return
+
+	#returns the levels per channel of the image precision, or None for float precisions
+	def PrecisionLevels(self, image):
+		return {1: 255, 2: 65535, 3: 4294967295}.get(int(image.get_precision()) // 100)
+
+	def StepCurve(self, canvas, step):
+		self.SRGBCurvesSpline(canvas.layers[step.target], step.channel, step.points)
+
+	def StepLevels(self, canvas, step):
+		self.Levels(canvas.layers[step.target], Gimp.HistogramChannel(step.channel), *step[2:])
+
+	def StepChain(self, canvas, step):
+		from instagram_recipes import BuildChain
+		self.ApplyCurveChain(canvas.layers[step.target], BuildChain(step.steps))
+
+	def StepHueSaturation(self, canvas, step):
+		canvas.layers[step.target].hue_saturation(Gimp.HueRange.ALL, step.hue, step.lightness, step.saturation, step.overlap)
+
+	def StepBrightnessContrast(self, canvas, step):
+		canvas.layers[step.target].brightness_contrast(step.brightness, step.contrast)
+
+	def StepDesaturate(self, canvas, step):
+		canvas.layers[step.target].desaturate(Gimp.DesaturateMode(step.mode))
+
+	def StepColorToAlpha(self, canvas, step):
+		self.ColorToAlpha(canvas.layers[step.target], step.transparency, step.opacity)
+
+	def StepCopy(self, canvas, step):
+		canvas.layers[step.layer] = self.AddLayerFromDrawable(canvas.drawable, canvas.image, canvas.layerGroup, getattr(Layers, step.name),
+															  Gimp.LayerMode(step.mode), step.desaturate, step.opacity)
+
+	def StepLayer(self, canvas, step):
+		canvas.layers[step.layer] = self.AddLayer(canvas.image, canvas.layerGroup, canvas.w, canvas.h, getattr(Layers, step.name),
+												  step.opacity, Gimp.LayerMode(step.mode))
+
+	#a fill going into a layer may become a filter on it, which is recorded for a later merge
+	def StepFill(self, canvas, step):
+		name = getattr(Layers, step.name)
+		mode = Gimp.LayerMode(step.mode)
+		if step.into is None:
+			canvas.layers[step.layer] = self.AddColorLayer(canvas.image, name, canvas.layerGroup, canvas.w, canvas.h, step.opacity, mode, *step.color)
+			return
+
+		target = canvas.layers[step.into]
+		layer = self.AddColor(canvas.image, name, canvas.layerGroup, target, canvas.w, canvas.h, step.opacity, mode, *step.color)
+		if layer is None:
+			canvas.filters[step.layer] = target
+		else:
+			canvas.layers[step.layer] = layer
+
+	def StepVignette(self, canvas, step):
+		canvas.layers[step.layer] = self.CreateVignette(canvas.image, canvas.layerGroup, canvas.w, canvas.h, step.type, step.opacity,
+														Gimp.LayerMode(step.mode), *step.color)
+
+	#gradient endpoints are relative to the layer, which is already at the offset of the region
+	def StepGradient(self, canvas, step):
+		color2 = step.color2 or (1.0, 1.0, 1.0)
+		self.SetContexts(Gimp.LayerMode(step.mode), step.reverse, *step.color, step.opacity, step.color2 is None, *color2)
+		canvas.layers[step.target].edit_gradient_fill(Gimp.GradientType(step.type), 0, False, 1, 0, True,
+													  step.start[0] * canvas.w, step.start[1] * canvas.h,
+													  step.end[0] * canvas.w, step.end[1] * canvas.h)
+
+	def StepMask(self, canvas, step):
+		mask = self.AddMask(canvas.layers[step.target], step.fill)
+		self.PasteVignette(canvas.image, mask, canvas.w, canvas.h, step.type, Gimp.LayerMode.NORMAL, step.color, step.background)
+
+	def StepBlur(self, canvas, step):
+		self.AddMBlur(canvas.layers[step.target], self.draft)
+
+	def StepNoise(self, canvas, step):
+		self.AddNoise(canvas.layers[step.target])
+
+	#merging a fill that became a filter merges the filters of the layer it went into instead. Either way the base
+	#layer is only known by the new handle afterwards.
+	def StepMergeDown(self, canvas, step):
+		canvas.layers.pop(step.base)
+		if step.layer in canvas.filters:
+			merged = canvas.filters.pop(step.layer)
+			merged.merge_filters()
+		else:
+			merged = self.MergeDown(canvas.image, canvas.layers.pop(step.layer))
+
+		if step.name is not None:
+			merged.set_name(Layers.labels[getattr(Layers, step.name)])
+		canvas.layers[step.into] = merged
+
+	def StepOpacity(self, canvas, step):
+		canvas.layers[step.target].set_opacity(step.opacity)
+
+	#
+	# --- Methods for progress and cancellation ---
+	#
+
+	#starts reporting progress for a run of the given predicted cost, dropping any cancel request left from before
+	def StartProgress(self, message, total):
+		self.progressTotal = max(total, 1)
+		self.progressDone = 0
+		if Gimp.get_parasite(cancelParasite) is not None:
+			Gimp.detach_parasite(cancelParasite)
+		Gimp.progress_init(message)
+
+	#advances progress by the predicted cost of the work just done, and stops the run if it has been cancelled
+	def Advance(self, cost):
+		self.progressDone += cost
+		Gimp.progress_update(min(1.0, self.progressDone / self.progressTotal))
+		if Gimp.get_parasite(cancelParasite) is not None:
+			Gimp.detach_parasite(cancelParasite)
+			raise Cancelled()
+
+	#removes a partly built group, with the scratch image it was built in if any, and restores the selection
+	def RollBack(self, target, image, layerGroup, selection):
+		if image is not target:
+			image.delete()
+		elif layerGroup is not None:
+			image.remove_layer(layerGroup)
+
+		if selection is not None:
+			target.select_item(Gimp.ChannelOps.REPLACE, selection)
+			target.remove_channel(selection)
+		elif image is target and layerGroup is not None:
+			Gimp.Selection.none(target)
+		return
+
+	#
+	# --- Methods for the live preview in the dialog ---
+	#
+
+	#adds a preview of the chosen effect and strength on a reduced copy of the visible image to the dialog. It is
+	#rendered again on a worker thread whenever either changes. Returns None when NumPy is not available.
+	def AddLivePreview(self, dialog, image, config):
+		try:
+			import numpy as np
+			from instagram_engine import Apply, Composite, Frame, NORMAL
+		except ImportError:
+			return None
+
+		from instagram_preview import LatestRenderer
+
+		proxy, scale = self.ReadProxy(image, previewSize)
+		ph, pw = proxy.shape[:2]
+		frame = Frame(pw, ph, 0, scale)
+
+		area = GimpUi.PreviewArea.new()
+		area.set_size_request(pw, ph)
+		dialog.get_content_area().pack_start(area, False, False, 0)
+		area.show()
+
+		#the effect group is composited over the image at the strength as its opacity
+		def render(settings):
+			effect, strength = settings
+			out = Composite(proxy, Apply(proxy, effect, True, frame), NORMAL, strength)
+			return np.rint(out[..., :3] * 255).astype(np.uint8).tobytes()
+
+		#draws a finished render on the main loop, unless newer settings arrived while it was queued
+		def draw(generation, pixels):
+			if renderer.IsCurrent(generation):
+				area.draw(0, 0, pw, ph, Gimp.ImageType.RGB_IMAGE, pixels, pw * 3)
+			return GLib.SOURCE_REMOVE
+
+		renderer = LatestRenderer(render, lambda generation, pixels: GLib.idle_add(draw, generation, pixels))
+
+		def changed(*args):
+			renderer.Request((config.get_property('effect'), config.get_property('strength')))
+
+		config.connect('notify::effect', changed)
+		config.connect('notify::strength', changed)
+		changed()
+
+		return renderer
+
+	#
+	# --- Methods for previewing all effects ---
+	#
+
+	#renders every effect on one shared proxy and opens the contact sheet
+	def RunPreview(self, procedure, run_mode, image, drawables, config, data):
+		InitGegl()
+
+		if not HasNumPy():
+			return procedure.new_return_values(Gimp.PDBStatusType.EXECUTION_ERROR,
+											   GLib.Error("Previews need NumPy in GIMP's Python"))
+
+		proxy, scale = self.ReadProxy(image, config.get_property('proxy-size'))
+		previews = self.RenderPreviews(proxy, scale)
+		sheet = self.ContactSheet(previews)
+
+		if run_mode == Gimp.RunMode.INTERACTIVE:
+			Gimp.Display.new(sheet)
+			Gimp.displays_flush()
+
+		#the sheet is returned so a script calling the procedure can use or delete it
+		return Gimp.ValueArray.new_from_values([
+			GObject.Value(Gimp.PDBStatusType, Gimp.PDBStatusType.SUCCESS),
+			GObject.Value(Gimp.Image, sheet)
+		])
+
+	#reads the visible image reduced so its longest side is size. The thumbnail is rendered from the mipmaps of
+	#the projection, so no full size copy of the image is made. Returns the pixels as RGBA floats and the scale of
+	#the proxy.
+	@Traced
+	def ReadProxy(self, image, size):
+		import numpy as np
+		from instagram_engine import ToFloat
+
+		w = image.get_width()
+		h = image.get_height()
+		scale = min(1.0, size / max(w, h))
+		data, pw, ph, bpp = image.get_thumbnail_data(max(1, round(w * scale)), max(1, round(h * scale)))
+		pixels = np.frombuffer(data.get_data(), np.uint8).reshape(ph, pw, bpp)
+
+		#grayscale thumbnails hold one value, followed by alpha if the image has it
+		if bpp < 3:
+			pixels = np.concatenate([np.repeat(pixels[..., :1], 3, axis=-1), pixels[..., 1:]], axis=-1)
+
+		return ToFloat(pixels), pw / w
+
+	#applies every effect to the proxy on a thread pool, since NumPy releases the GIL for the heavy work
+	@Traced
+	def RenderPreviews(self, proxy, scale):
+		from concurrent.futures import ThreadPoolExecutor
+		from instagram_engine import Apply, Frame
+
+		frame = Frame(proxy.shape[1], proxy.shape[0], 0, scale)
+		effects = [identifier for identifier, _ in effectsList]
+		with ThreadPoolExecutor(max_workers=min(len(effects), os.cpu_count() or 1)) as pool:
+			previews = pool.map(lambda effect: Apply(proxy, effect, True, frame), effects)
+			return list(zip(effects, previews))
+
+	#lays the previews out in a grid with a label under each, in the order of effectsList. Transparent parts of the
+	#previews are shown over checks.
+	@Traced
+	def ContactSheet(self, previews):
+		import numpy as np
+		from instagram_pixels import WritePixels
+		from instagram_engine import Composite
+
+		ph, pw = previews[0][1].shape[:2]
+		rows = (len(previews) + sheetColumns - 1) // sheetColumns
+		cellW = pw + sheetMargin
+		cellH = ph + sheetLabel + sheetMargin
+		sw = sheetColumns * cellW + sheetMargin
+		sh = rows * cellH + sheetMargin
+
+		checks = np.ones((ph, pw, 4), np.float32)
+		checkY, checkX = np.indices((ph, pw)) // sheetCheckSize
+		checks[..., :3] = np.where((checkY + checkX) % 2 == 0, *sheetChecks)[..., None]
+
+		pixels = np.full((sh, sw, 3), sheetBackground, np.float32)
+		for index, (_, preview) in enumerate(previews):
+			x = sheetMargin + (index % sheetColumns) * cellW
+			y = sheetMargin + (index // sheetColumns) * cellH
+			pixels[y:y + ph, x:x + pw] = Composite(checks, preview)[..., :3]
+
+		sheet = Gimp.Image.new(sw, sh, Gimp.ImageBaseType.RGB)
+		sheet.undo_disable()
+
+		layer = Gimp.Layer.new(sheet, "Previews", sw, sh, Gimp.ImageType.RGB_IMAGE, 100, Gimp.LayerMode.NORMAL)
+		sheet.insert_layer(layer, None, 0)
+		WritePixels(layer, pixels, 0, 0, "R'G'B' float")
+
+		#label each preview with the effect name
+		labels = dict(effectsList)
+		font = Gimp.context_get_font()
+		for index, (effect, _) in enumerate(previews):
+			label = Gimp.TextLayer.new(sheet, labels[effect], font, sheetLabel * 0.6, Gimp.Unit.pixel())
+			sheet.insert_layer(label, None, 0)
+			label.set_color(Gegl.Color.new('white'))
+			label.set_offsets(sheetMargin + (index % sheetColumns) * cellW,
+							  sheetMargin + (index // sheetColumns) * cellH + ph + 4)
+
+		sheet.undo_enable()
+		return sheet
+
+	#
+	# --- Methods for keeping looks to switch between ---
+	#
+
+	#returns what a look is built from: the size and precision of the image and the top level layers that are not
+	#looks or the snapshot, described with their preview checksums as for the snapshot, leaving out one item if given.
+	#Returns None when that cannot be told, as when a visible layer has filters.
+	def LookSource(self, image, exclude=None):
+		layers = [layer for layer in image.get_layers()
+				  if layer.get_parasite(lookParasite) is None and layer.get_parasite(snapshotParasite) is None]
+		source = self.VisibleLayers(layers, exclude)
+		if source is None:
+			return None
+
+		return [image.get_width(), image.get_height(), image.get_precision(), source]
+
+	#hides every kept look and removes those built from other layers, from layers changed since, in another region or
+	#with other settings. Shows the look for the effect at the given strength and returns True when it is still valid,
+	#so GIMP only has to render the projection again.
+	@Traced
+	def ShowLook(self, image, effect, strength, region, settings):
+		source = self.LookSource(image)
+		found = False
+		for layer in image.get_layers():
+			parasite = layer.get_parasite(lookParasite)
+			if parasite is None:
+				continue
+
+			look = ParasiteValue(parasite)
+			if (source is None or look['source'] != source or look.get('region') != (region and list(region))
+					or look.get('settings') != settings):
+				image.remove_layer(layer)
+			elif look['effect'] == effect:
+				layer.set_visible(True)
+				layer.set_opacity(strength)
+				found = True
+			else:
+				layer.set_visible(False)
+
+		return found
+
+	#tags a finished effect group as a kept look, unless what it was built from cannot be checked later
+	def KeepLook(self, image, layerGroup, effect, settings):
+		source = self.LookSource(image, layerGroup)
+		if source is None:
+			return
+
+		look = {'effect': effect, 'source': source, 'region': self.region and list(self.region), 'settings': settings}
+		data = ParasiteData(look)
+		layerGroup.attach_parasite(Gimp.Parasite.new(lookParasite, Gimp.PARASITE_PERSISTENT, data))
+		return
+
+	#
+	# --- Methods for reusing a snapshot of the visible image ---
+	#
+
+	#returns the hidden snapshot of the visible image, taken again when what the image is made of has changed since.
+	#Returns None and leaves no snapshot when that cannot be told, as when a visible drawable has filters.
+	@Traced
+	def Snapshot(self, image, exclude):
+		source = self.SnapshotSource(image, exclude)
+		for layer in image.get_layers():
+			parasite = layer.get_parasite(snapshotParasite)
+			if parasite is None:
+				continue
+
+			if source is not None and ParasiteValue(parasite) == source:
+				return layer
+			image.remove_layer(layer)
+
+		if source is None:
+			return None
+
+		snapshot = Gimp.Layer.new_from_visible(image, image, snapshotName)
+		snapshot.set_visible(False)
+		image.insert_layer(snapshot, None, len(image.get_layers()))
+		snapshot.attach_parasite(Gimp.Parasite.new(snapshotParasite, Gimp.PARASITE_PERSISTENT, ParasiteData(source)))
+		return snapshot
+
+	#returns what the visible image is made of: the size and precision of the image, then the layers that are seen,
+	#leaving out one item. Returns None when a visible channel is composited over them.
+	def SnapshotSource(self, image, exclude):
+		if any(channel.get_visible() for channel in image.get_channels()):
+			return None
+
+		layers = self.VisibleLayers(image.get_layers(), exclude)
+		if layers is None:
+			return None
+
+		return [image.get_width(), image.get_height(), image.get_precision(), layers]
+
+	#returns the id, offsets, size, blending and preview checksum of each visible layer, and of its mask, in stacking
+	#order with group layers holding their children, leaving out one item if given. Returns None when a layer has
+	#filters, whose settings can't be compared.
+	def VisibleLayers(self, layers, exclude=None):
+		source = []
+		for layer in layers:
+			if (exclude is not None and layer.get_id() == exclude.get_id()) or not layer.get_visible():
+				continue
+			if layer.get_filters():
+				return None
+
+			_, x, y = layer.get_offsets()
+			entry = [layer.get_id(), x, y, layer.get_width(), layer.get_height(), layer.get_opacity(), layer.get_mode(),
+					 layer.get_blend_space(), layer.get_composite_space(), layer.get_composite_mode()]
+			if layer.is_group():
+				children = self.VisibleLayers(layer.get_children(), exclude)
+				if children is None:
+					return None
+				entry.append(children)
+			else:
+				entry.append(self.PreviewChecksum(layer))
+
+			mask = layer.get_mask()
+			if mask is not None:
+				entry += [self.PreviewChecksum(mask), layer.get_apply_mask(), layer.get_show_mask()]
+
+			source.append(entry)
+
+		return source
+
+	#returns a checksum of a reduced preview of a drawable, which GIMP renders without passing its pixels over
+	def PreviewChecksum(self, drawable):
+		data, _, _, _ = drawable.get_thumbnail_data(checksumPreviewSize, checksumPreviewSize)
+		return zlib.crc32(data.get_data())
+
+	#
+	# --- Methods for caching feathered vignette masks ---
+	#
+
+	#pastes a cached feathered ellipse drawing into a full size layer or mask. The ellipse, or the area outside it,
+	#is filled with a color in the given mode over a background color, or over transparency when there is none.
+	@Traced
+	def PasteVignette(self, image, drawable, w, h, type, mode, color, background = None, outside = False):
+		name = self.VignetteBuffer(w, h, type, mode, color, background, outside)
+		Gimp.Selection.none(image)
+		floating = Gimp.edit_named_paste(drawable, name, False)
+
+		#the drawing is cached at proxy size, so it is scaled up before it is anchored at the origin of the region
+		floating.scale(w, h, False)
+		if self.region is None:
+			floating.set_offsets(0, 0)
+		else:
+			floating.set_offsets(self.region[0], self.region[1])
+		Gimp.floating_sel_anchor(floating)
+		return
+
+	#returns the name of the buffer holding a proxy sized vignette drawing, building it when it is not cached
+	def VignetteBuffer(self, w, h, type, mode, color, background, outside):
+		scale = min(1.0, vignetteProxy / max(w, h))
+		pw = max(1, round(w * scale))
+		ph = max(1, round(h * scale))
+
+		settings = repr((int(mode), tuple(color), background and tuple(background), outside))
+		name = f"{vignettePrefix}-{type}-{pw}x{ph}-{zlib.crc32(settings.encode()):08x}"
+		if name not in Gimp.buffers_get_name_list(vignettePrefix):
+			name = self.BuildVignetteBuffer(name, pw, ph, type, mode, color, background, outside)
+
+		order = [n for n in self.VignetteOrder() if n != name] + [name]
+		self.EvictVignetteBuffers(order)
+		return name
+
+	#draws the vignette on a small proxy image and copies it to a named buffer
+	@Traced
+	def BuildVignetteBuffer(self, name, pw, ph, type, mode, color, background, outside):
+		proxy = Gimp.Image.new(pw, ph, Gimp.ImageBaseType.RGB)
+		proxy.undo_disable()
+		try:
+			layer = Gimp.Layer.new(proxy, name, pw, ph, Gimp.ImageType.RGBA_IMAGE, 100, Gimp.LayerMode.NORMAL)
+			proxy.insert_layer(layer, None, 0)
+			layer.fill(Gimp.FillType.TRANSPARENT)
+			if background is not None:
+				self.AddFill(proxy, layer, Gimp.LayerMode.NORMAL, *background)
+
+			#the same steps CreateVignette took at full size, with the feather scaled along with the ellipse
+			self.SelectEllipse(proxy, pw, ph, type)
+			if outside:
+				Gimp.Selection.invert(proxy)
+			self.AddFill(proxy, layer, mode, *color)
+
+			return Gimp.edit_named_copy([layer], name)
+		finally:
+			proxy.delete()
+
+	#returns the cached buffer names, least recently used first. The order lives in a session parasite.
+	def VignetteOrder(self):
+		parasite = Gimp.get_parasite(vignettePrefix)
+		if parasite is None:
+			return []
+
+		return ParasiteValue(parasite)
+
+	#deletes the least recently used buffers over the memory cap, always keeping the most recent one
+	def EvictVignetteBuffers(self, order):
+		existing = set(Gimp.buffers_get_name_list(vignettePrefix))
+		order = [n for n in order if n in existing]
+		sizes = {n: Gimp.buffer_get_width(n) * Gimp.buffer_get_height(n) * Gimp.buffer_get_bytes(n) for n in order}
+
+		while len(order) > 1 and sum(sizes[n] for n in order) > vignetteCacheBytes:
+			Gimp.buffer_delete(order.pop(0))
+
+		Gimp.attach_parasite(Gimp.Parasite.new(vignettePrefix, 0, ParasiteData(order)))
+		return
+
+	#sets contexts. Settings for all fills and gradients flow though here.
+	def SetContexts(self, mode, reverse = False, r = 0.0, g = 0.0, b = 0.0, opacity = 100, singleColor = True, r2 = 1.0, g2 = 1.0, b2 = 1.0):
+		Gimp.context_set_opacity(opacity)
+		Gimp.context_set_paint_mode(mode)
+		Gimp.context_set_gradient_blend_color_space(Gimp.GradientBlendColorSpace.RGB_LINEAR)
+		Gimp.context_set_gradient_reverse(reverse)
+
+		fgColor = Gegl.Color.new('black')
+		bgColor = Gegl.Color.new('white')
+		fgColor.set_rgba(r, g, b, 0.0)
+		bgColor.set_rgba(r2, g2, b2, 0.0)
+
+		Gimp.context_set_foreground(fgColor)
+		Gimp.context_set_background(bgColor)
+
+		Gimp.context_set_gradient_reverse(reverse)
+		if singleColor == True:
+			Gimp.context_set_gradient_fg_transparent()
+		else:
+			Gimp.context_set_gradient_fg_bg_rgb()
+
+		return
+	
+	#
+	# --- Methods for applying curves_spline in non-linear space ---
+	#
+
+	@Traced
+	def SRGBCurvesSpline(self, drawable, channel, spline):
+			# Compose sRGB -> linear, the spline and linear -> sRGB into a single pass
+			chain = CurveChain()
+			chain.SRGBSpline(channel, spline)
+			self.ApplyCurveChain(drawable, chain)
+
+	#applies a compiled curve chain with one curves_explicit call per channel
+	@Traced
+	def ApplyCurveChain(self, drawable, chain):
+		for channel, lut in chain.Compile():
+			drawable.curves_explicit(Gimp.HistogramChannel(channel), lut)
+
+	def FastSRGBLuts(self, samplecount=1024):
+		return FastSRGBLuts(samplecount)
+
+	def ConvertSRGBToLinear(self, values, lin_lut):
+		sc = len(lin_lut) - 1
+		return [lin_lut[int(v * sc)] for v in values]
+
+	def ConvertLinearToSRGB(self, values, srgb_lut):
+		sc = len(srgb_lut) - 1
+		return [srgb_lut[int(v * sc)] for v in values]
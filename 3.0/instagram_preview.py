@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+'''
+Scheduling for the live preview in the Instagram plugin dialog. Preview renders run one at a time on a worker
+thread. Settings that arrive while a render is running replace any request still waiting, so intermediate settings
+are never rendered, and a finished render is only delivered if no newer request was made in the meantime. A render
+that fails is reported on stderr and the worker goes on with the next request.
+'''
+
+import threading, traceback
+
+#renders the latest requested settings on a worker thread and hands each current result to deliver
+class LatestRenderer:
+	def __init__(self, render, deliver):
+		self.render = render
+		self.deliver = deliver
+		self.lock = threading.Lock()
+		self.generation = 0
+		self.pending = None
+		self.running = False
+
+	#asks for the settings to be rendered, replacing any request that has not started yet
+	def Request(self, settings):
+		with self.lock:
+			self.generation += 1
+			self.pending = (self.generation, settings)
+			if self.running:
+				return
+			self.running = True
+
+		threading.Thread(target=self.Work, daemon=True).start()
+
+	#drops the waiting request and any render still running
+	def Cancel(self):
+		with self.lock:
+			self.generation += 1
+			self.pending = None
+
+	#returns True while no newer request or cancel has been made since a render of this generation started
+	def IsCurrent(self, generation):
+		with self.lock:
+			return generation == self.generation
+
+	#renders requests until none is waiting. The worker is marked as stopped in the same step that finds nothing
+	#waiting, so a request made just after starts a new one.
+	def Work(self):
+		try:
+			while True:
+				with self.lock:
+					if self.pending is None:
+						self.running = False
+						return
+					generation, settings = self.pending
+					self.pending = None
+
+				try:
+					result = self.render(settings)
+					if self.IsCurrent(generation):
+						self.deliver(generation, result)
+				except Exception:
+					traceback.print_exc()
+		except BaseException:
+			#a worker stopped any other way must not leave later requests waiting for it
+			with self.lock:
+				self.running = False
+			raise
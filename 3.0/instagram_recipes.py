@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+
+'''
+The Instagram effects of the GIMP 3 plugin described as data. Each recipe is a list of typed steps, applied in
+order to the layers of an effect group: per-pixel adjustments, layers copied from the image or filled with a color,
+vignettes, gradients, masks, blur and noise. Layers are named by handles; "base" is the copy of the visible image at
+the bottom of the group and "group" is the group itself. Modes, channels and types are the values of the GIMP enums.
+
+Optimize turns a recipe into the plan the plugin runs. It drops steps that cannot change a pixel, moves curves and
+levels next to earlier ones on the same layer when only steps on other layers lie between them, and merges each run
+of them into one lookup table per channel. Nothing here needs GIMP, so recipes can be inspected and optimized anywhere.
+'''
+
+from collections import namedtuple
+from instagram_curves import CurveChain, VALUE, RED, GREEN, BLUE
+
+#
+# --- Values of the GIMP enums used by the recipes ---
+#
+
+#Gimp.LayerMode values
+OVERLAY = 23
+NORMAL = 28
+MULTIPLY = 30
+SCREEN = 31
+DODGE = 42
+HARDLIGHT = 44
+SOFTLIGHT = 45
+
+#Gimp.DesaturateMode values
+LIGHTNESS = 0
+
+#Gimp.GradientType values
+LINEAR, BILINEAR, RADIAL = range(3)
+
+#Gimp.AddMaskType values used for masks
+WHITE, BLACK = range(2)
+
+#Vignettes option values of the plugin
+STANDARD, LARGE, OBLATE, NONE = range(4)
+
+#
+# --- Steps ---
+#
+
+#a smooth curve applied in non-linear space, with the points as a flat [x1, y1, x2, y2, ...] list
+Curve = namedtuple('Curve', ['target', 'channel', 'points'])
+Levels = namedtuple('Levels', ['target', 'channel', 'lowInput', 'highInput', 'clampInput', 'gamma', 'lowOutput', 'highOutput', 'clampOutput'])
+HueSaturation = namedtuple('HueSaturation', ['target', 'hue', 'lightness', 'saturation', 'overlap'], defaults=[0])
+BrightnessContrast = namedtuple('BrightnessContrast', ['target', 'brightness', 'contrast'])
+Desaturate = namedtuple('Desaturate', ['target', 'mode'])
+ColorToAlpha = namedtuple('ColorToAlpha', ['target', 'transparency', 'opacity'])
+
+#a copy of the drawable the plugin was run on, named by a Layers symbol
+Copy = namedtuple('Copy', ['layer', 'name', 'mode', 'opacity', 'desaturate'], defaults=[NORMAL, 100, False])
+
+#an empty layer named by a Layers symbol
+Layer = namedtuple('Layer', ['layer', 'name', 'mode', 'opacity'], defaults=[NORMAL, 100])
+
+#a layer filled with a linear color. With procedural fills and a layer to go into, it is a filter on that layer.
+Fill = namedtuple('Fill', ['layer', 'name', 'into', 'opacity', 'mode', 'color'])
+
+#a vignette layer filled with a color outside a feathered ellipse, or an empty layer for NONE
+Vignette = namedtuple('Vignette', ['layer', 'type', 'opacity', 'mode', 'color'], defaults=[100, NORMAL, (0.0, 0.0, 0.0)])
+
+#a gradient fill from start to end, given as fractions of the region the effect is built in. Without a second
+#color the gradient fades the first one to transparency.
+Gradient = namedtuple('Gradient', ['target', 'type', 'start', 'end', 'mode', 'reverse', 'color', 'opacity', 'color2'],
+					  defaults=[NORMAL, False, (0.0, 0.0, 0.0), 100, None])
+
+#a layer mask of a mask type, with a feathered ellipse pasted into it in a color over a background
+Mask = namedtuple('Mask', ['target', 'fill', 'type', 'color', 'background'])
+
+Blur = namedtuple('Blur', ['target'])
+Noise = namedtuple('Noise', ['target'])
+
+#merges a layer into the base layer below it, which is then known by another handle and optionally renamed
+MergeDown = namedtuple('MergeDown', ['layer', 'base', 'into', 'name'], defaults=[None])
+Opacity = namedtuple('Opacity', ['target', 'opacity'])
+
+#curves and levels on one layer, composed into one lookup table per channel. Only made by Optimize.
+Chain = namedtuple('Chain', ['target', 'steps'])
+
+#steps that map each channel on its own, so that runs of them compose
+curveSteps = (Curve, Levels)
+
+#steps that add a layer to the group
+layerSteps = (Copy, Layer, Fill, Vignette)
+
+#
+# --- Recipes ---
+#
+
+recipes = {
+	"AMARO": [
+		#adjust curves colors in non-linear space then create vignette
+		Curve('base', RED, [0, 30/255, 156/255, 196/255, 205/255, 203/255, 255/255, 255/255]),
+		Curve('base', GREEN, [0, 0, 61/255, 67/255, 139/255, 184/255, 200/255, 206/255, 1.0, 1.0]),
+		Curve('base', BLUE, [0, 20/255, 146/255, 184/255, 220/255, 222/255, 1.0, 1.0]),
+		#effect added to GIMP 3 version
+		ColorToAlpha('base', 0.0, 0.78),
+		Vignette('vignette', STANDARD, 60)
+	],
+	"APOLLO": [
+		#copy image black and white then add vignette and green layer
+		Copy('bw', 'BW', NORMAL, 50, True),
+		Vignette('vignette', LARGE, 40),
+		Fill('color', 'COLOR', 'group', 50, OVERLAY, (0.243, 0.804, 0.165))
+	],
+	"BRANNAN": [
+		#copy image set to overlay and desaturate then adjust hue/saturation, and merge down
+		Copy('layer2', 'LAYER2', OVERLAY, 37, True),
+		HueSaturation('layer2', 0, 0, -30),
+		MergeDown('layer2', 'base', 'merged', 'MERGED'),
+		#adjust levels colors and brightness/contrast in the merged layer
+		Levels('merged', VALUE, 0, 1.0, True, 1.0, 9/255, 1.0, True),
+		Levels('merged', RED, 0, 228/255, True, 1.0, 23/255, 1.0, True),
+		Levels('merged', GREEN, 0, 1.0, True, 1.0, 3/255, 1.0, True),
+		Levels('merged', BLUE, 0, 239/255, True, 1.0, 12/255, 1.0, True),
+		BrightnessContrast('merged', -8/100, 25/100),
+		#adjust levels colors and brightness/contrast (again)
+		Levels('merged', VALUE, 0, 1.0, True, 0.91, 7/255, 1.0, True),
+		Levels('merged', RED, 0, 1.0, True, 1.0, 9/255, 1.0, True),
+		Levels('merged', GREEN, 0, 224/255, True, 1.0, 3/255, 1.0, True),
+		Levels('merged', BLUE, 0, 1.0, True, 0.94, 18/255, 1.0, True),
+		BrightnessContrast('merged', -4/100, -15/100),
+		#changed opacity of the layer in this version
+		Opacity('merged', 40),
+		#add new color layer in multiply mode. Color and opacity have been changed in this version.
+		Fill('color', 'COLOR', 'merged', 35, MULTIPLY, (0.99, 0.830, 0.480))
+	],
+	"EARLYBIRD": [
+		#adjust hue, saturation, lightness, colors and brightness/contrast
+		HueSaturation('base', 0, 1, -30),
+		Levels('base', VALUE, 0, 1.0, True, 1.2, 0, 1.0, True),
+		Levels('base', RED, 0, 1.0, True, 1.0, 25/255, 1.0, True),
+		BrightnessContrast('base', 8/100, 20/100),
+		#adjust hue, saturation and lightness (again)
+		HueSaturation('base', 0, 0, -15),
+		Levels('base', VALUE, 0, 235/255, True, 0.9, 0, 1.0, True),
+		#add new color layer in multiply mode then add color vignette in normal mode
+		Fill('color', 'COLOR', 'base', 100, MULTIPLY, (1.0, 240/255, 205/255)),
+		Vignette('vignette', STANDARD, 6, NORMAL, (0.722, 0.722, 0.722))
+	],
+	"GOTHAM": [
+		#desaturate base image
+		Desaturate('base', LIGHTNESS),
+		#copy image in hard light mode and adjust color curves
+		Copy('layer2', 'LAYER2', HARDLIGHT),
+		Curve('layer2', BLUE, [0, 0, 63/255, 98/255, 128/255, 128/255, 189/255, 159/255, 1.0, 1.0]),
+		#add new layer in screen mode then add blur and noise
+		Copy('layer3', 'LAYER3', SCREEN, 75),
+		Blur('layer3'),
+		Noise('layer3')
+	],
+	"INKWELL": [
+		#desaturate, adjust color curves and brightness/contrast
+		Desaturate('base', LIGHTNESS),
+		Curve('base', VALUE, [0.0, 0.0, 0.051, 0.0, 0.325, 0.490, 0.698, 0.859, 1.0, 1.0]),
+		BrightnessContrast('base', -0.15, 0.15)
+	],
+	"LORDKELVIN": [
+		#adjust color curves
+		Curve('base', VALUE, [10/255, 0, 1.0, 1.0]),
+		Curve('base', RED, [0, 63/255, 100/255, 200/255, 1.0, 1.0]),
+		Curve('base', GREEN, [0, 30/255, 180/255, 190/255, 1.0, 210/255]),
+		Curve('base', BLUE, [0, 90/255, 177/255, 114/255, 1.0, 188/255])
+	],
+	"POPROCKET": [
+		#add color1 in screen mode and set color gradient
+		Vignette('color1', NONE, 100, SCREEN),
+		Gradient('color1', RADIAL, (0.5, 0.5), (0.95, 0.5), NORMAL, False, (0.900, 0.153, 0.274)),
+		#added to the GIMP 3 version
+		ColorToAlpha('color1', 0.0, 1.0),
+		#add color2 in overlay mode and set color gradient
+		Vignette('color2', NONE, 100, SOFTLIGHT),
+		Gradient('color2', RADIAL, (0.5, 0.5), (1.5, 0.5), OVERLAY, True, (0.059, 0.019, 0.180))
+	],
+	"RISE": [
+		#adjust hue saturation and levels
+		HueSaturation('base', 20, 0, -50),
+		Levels('base', VALUE, 0, 1.0, True, 1.23, 0, 1.0, True),
+		#add vignette layer in overlay mode and set color gradient
+		Vignette('vignette', OBLATE, 100, OVERLAY),
+		Gradient('vignette', RADIAL, (0.5, 0.5), (1.5, 0.5), OVERLAY),
+		#add new noise layer in screen mode with opacity 20
+		Fill('noise', 'NOISE', None, 20, SCREEN, (0.0, 0.0, 0.0)),
+		Noise('noise'),
+		#add new color layer in overlay mode
+		Fill('color', 'COLOR', 'group', 50, OVERLAY, (0.929, 0.541, 0))
+	],
+	"TOASTER": [
+		#add new layer and adjust color curves, with a white mask holding a black filled ellipse
+		Copy('layer2', 'LAYER2'),
+		Curve('layer2', VALUE, [25/255, 0, 1.0, 1.0]),
+		Mask('layer2', WHITE, STANDARD, (0.0, 0.0, 0.0), (1.0, 1.0, 1.0)),
+		#gradient layer in normal mode, with fg and bg colors set
+		Copy('gradient', 'GRADIENT', NORMAL, 70),
+		Gradient('gradient', BILINEAR, (0.0, 0.5), (1.0, 0.5), NORMAL, False, (0.227, 0.040, 0.349), 30, (0.995, 0.663, 0.341)),
+		#add new color layer in screen mode, with a black mask holding a white filled ellipse
+		Fill('layer3', 'LAYER3', None, 35, SCREEN, (0.114, 0.114, 0.114)),
+		Mask('layer3', BLACK, LARGE, (1.0, 1.0, 1.0), (0.0, 0.0, 0.0)),
+		#color layer in dodge mode with mask
+		Fill('color', 'COLOR', None, 1, DODGE, (0.823, 0.6, 0.003)),
+		Mask('color', BLACK, LARGE, (1.0, 1.0, 1.0), (0.0, 0.0, 0.0))
+	],
+	"VALENCIA": [
+		#add new layer in multiply mode and merge down
+		Fill('color', 'COLOR', 'base', 100, MULTIPLY, (0.965, 0.867, 0.678)),
+		MergeDown('color', 'base', 'merged'),
+		#adjust color curves and levels
+		Curve('merged', VALUE, [0, 50/255, 75/255, 110/255, 175/255, 220/255, 1.0, 1.0]),
+		Levels('merged', BLUE, 0, 1.0, True, 1.0, 126/255, 1.0, True),
+		ColorToAlpha('merged', 0.0, 0.78)
+	],
+	"WALDEN": [
+		#adjust color curves
+		Curve('base', VALUE, [12/255, 0, 1.0, 1.0]),
+		Curve('base', RED, [10/255, 0, 247/255, 1.0]),
+		Curve('base', BLUE, [0, 38/255, 1.0, 203/255]),
+		#adjust levels and color curves (again)
+		Levels('base', VALUE, 0, 235/255, True, 1.17, 55/255, 1.0, True),
+		Curve('base', VALUE, [41/255, 0, 125/255, 124/255, 1.0, 1.0]),
+		#create new layer in soft light mode and apply gradient starting from top left
+		Layer('gradient', 'GRADIENT', SOFTLIGHT, 80),
+		Gradient('gradient', RADIAL, (0.0, 0.0), (0.5, 0.5), SOFTLIGHT, False, (1.0, 1.0, 1.0))
+	]
+}
+
+#
+# --- Costs ---
+#
+
+#predicted cost of each type of step in full-image passes, used to weight progress. The motion blur gathers a long
+#run of samples for every pixel, which makes it far heavier than a pass.
+stepCosts = {
+	Curve: 1, Levels: 1, HueSaturation: 1, BrightnessContrast: 1, Desaturate: 1, ColorToAlpha: 1,
+	Copy: 2, Layer: 1, Fill: 2, Vignette: 2, Gradient: 1, Mask: 2,
+	Blur: 32, Noise: 2, MergeDown: 2, Opacity: 0
+}
+
+#returns the predicted cost of a step, with the blur run at a draft factor. A chain takes one pass for each color
+#channel it changes.
+def Cost(step, draft=1):
+	if isinstance(step, Chain):
+		channels = {s.channel for s in step.steps}
+		return 3 if VALUE in channels else len(channels)
+	elif isinstance(step, Blur):
+		return stepCosts[Blur] / draft
+
+	return stepCosts[type(step)]
+
+#
+# --- Optimizer ---
+#
+
+#returns the handles of the layers a step reads or changes
+def Touches(step):
+	if isinstance(step, Chain):
+		return {step.target}
+	elif isinstance(step, Fill):
+		return {step.layer} if step.into is None else {step.layer, step.into}
+	elif isinstance(step, MergeDown):
+		return {step.layer, step.base, step.into}
+	elif isinstance(step, layerSteps):
+		return {step.layer}
+
+	return {step.target}
+
+#returns True for a per-pixel step that leaves every value as it is
+def IsIdentity(step):
+	if isinstance(step, Curve):
+		return all(x == y for x, y in zip(step.points[0::2], step.points[1::2]))
+	elif isinstance(step, Levels):
+		return (step.lowInput, step.highInput, step.gamma, step.lowOutput, step.highOutput) == (0, 1.0, 1.0, 0, 1.0)
+	elif isinstance(step, HueSaturation):
+		return (step.hue, step.lightness, step.saturation) == (0, 0, 0)
+	elif isinstance(step, BrightnessContrast):
+		return (step.brightness, step.contrast) == (0, 0)
+
+	return False
+
+#returns True for a layer too faint to change a pixel. A layer at an opacity can move a value by at most that
+#fraction, so it is invisible when that is under half a level of the image precision.
+def IsInvisible(step, levels=None):
+	if not isinstance(step, layerSteps):
+		return False
+
+	limit = 0.0 if levels is None else 0.5 / levels
+	return step.opacity / 100 <= limit
+
+#drops identity steps, and invisible layers together with the steps that only work on them. A layer that another
+#layer is merged into or filled into is kept.
+def DropNoOps(steps, levels=None):
+	plan = []
+	dropped = set()
+	for index, step in enumerate(steps):
+		if IsIdentity(step):
+			continue
+
+		if IsInvisible(step, levels):
+			handle = step.layer
+			later = [Touches(s) for s in steps[index + 1:] if handle in Touches(s)]
+			if all(touched == {handle} for touched in later):
+				dropped.add(handle)
+				continue
+
+		if Touches(step) <= dropped:
+			continue
+
+		plan.append(step)
+
+	return plan
+
+#moves each curve or levels step back to just after an earlier one on the same layer, when every step in between
+#works on other layers, so that they become a run that merges. Steps that add or merge layers never move, which
+#keeps the stacking order.
+def Reorder(steps):
+	plan = []
+	for step in steps:
+		position = len(plan)
+		if isinstance(step, curveSteps):
+			for index in range(len(plan) - 1, -1, -1):
+				if step.target in Touches(plan[index]):
+					if isinstance(plan[index], curveSteps):
+						position = index + 1
+					break
+
+		plan.insert(position, step)
+
+	return plan
+
+#composes the steps of a chain into a curve chain
+def BuildChain(steps):
+	chain = CurveChain()
+	for step in steps:
+		if isinstance(step, Curve):
+			chain.SRGBSpline(step.channel, step.points)
+		else:
+			chain.Levels(*step[1:])
+
+	return chain
+
+#merges each run of curves and levels on one layer into a chain, when its lookup tables take fewer passes than
+#the steps on their own. Each step takes one pass, while the chain takes one per channel it changes, or a single
+#one when all three share a table.
+def MergeCurves(steps):
+	runs = []
+	for step in steps:
+		previous = runs[-1] if runs else None
+		if isinstance(step, curveSteps) and isinstance(previous, list) and previous[0].target == step.target:
+			previous.append(step)
+		elif isinstance(step, curveSteps):
+			runs.append([step])
+		else:
+			runs.append(step)
+
+	plan = []
+	for run in runs:
+		if not isinstance(run, list):
+			plan.append(run)
+		elif len(run) > 1 and len(BuildChain(run).Compile()) < len(run):
+			plan.append(Chain(run[0].target, tuple(run)))
+		else:
+			plan.extend(run)
+
+	return plan
+
+#returns the plan for a recipe, for an image with the given number of levels per channel or None for float
+def Optimize(steps, levels=None):
+	return MergeCurves(Reorder(DropNoOps(list(steps), levels)))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+'''
+A long-lived job server that keeps one GIMP 3 process running and applies the Instagram plugin to a stream of
+images, so the cost of starting GIMP is paid once rather than once per file. Jobs are JSON objects, one per line:
+
+    {"id": 1, "input": "in.jpg", "effect": "AMARO", "output": "out.png", "format": "png"}
+
+with optional "strength": 0-100, "output_mode": "FLAT", "quality": "QUARTER" and "procedural_fills": true, and
+every job is answered with one JSON line holding its status, output path and timing. The server listens on a Unix
+socket (or reads stdin with --stdin) and runs inside GIMP's Python batch interpreter:
+
+    gimp-console-3.0 -i --quit --batch-interpreter=python-fu-eval \
+        -b "import runpy; runpy.run_path('instagram_server.py', run_name='__main__')"
+
+Pass options through the INSTAGRAM_SERVER_ARGS environment variable, for example "--socket /tmp/ig.sock".
+The same file acts as a client outside GIMP: python3 instagram_server.py --client < jobs.jsonl
+'''
+
+import os, sys, json, time, shlex, socket, argparse, threading
+
+#default location of the server socket
+defaultSocket = os.path.join(os.environ.get('XDG_RUNTIME_DIR', '/tmp'), 'gimp_instagram.sock')
+
+#loads an image, runs the instagram procedure non-interactively, exports the result and frees the image
+def RunJob(job):
+	from gi.repository import Gimp, Gio
+
+	path = job['input']
+	output = job['output']
+	fmt = job.get('format') or os.path.splitext(output)[1].lstrip('.').lower()
+	if not output.lower().endswith('.' + fmt):
+		output = f"{output}.{fmt}"
+
+	image = Gimp.file_load(Gimp.RunMode.NONINTERACTIVE, Gio.File.new_for_path(path))
+	try:
+		#the image is saved and deleted without ever being undone, so its steps need no undo data
+		image.undo_disable()
+		drawables = image.get_selected_drawables() or image.get_layers()[:1]
+
+		procedure = Gimp.get_pdb().lookup_procedure('instagram')
+		config = procedure.create_config()
+		config.set_property('run-mode', Gimp.RunMode.NONINTERACTIVE)
+		config.set_property('image', image)
+		config.set_core_object_array('drawables', drawables[:1])
+		config.set_property('effect', job['effect'])
+		if 'strength' in job:
+			config.set_property('strength', float(job['strength']))
+		if 'output_mode' in job:
+			config.set_property('output', job['output_mode'])
+		if 'quality' in job:
+			config.set_property('quality', job['quality'])
+		if 'procedural_fills' in job:
+			config.set_property('procedural-fills', bool(job['procedural_fills']))
+
+		result = procedure.run(config)
+		status = result.index(0)
+		if status != Gimp.PDBStatusType.SUCCESS:
+			raise RuntimeError(f"instagram returned {status.value_nick}")
+
+		#formats without layers are written from the merged visible image
+		if fmt != 'xcf':
+			image.merge_visible_layers(Gimp.MergeType.CLIP_TO_IMAGE)
+
+		Gimp.file_save(Gimp.RunMode.NONINTERACTIVE, image, Gio.File.new_for_path(output), None)
+	finally:
+		#deleting the image releases its layers and their GEGL buffers before the next job
+		image.delete()
+
+	return output
+
+#runs one job spec and returns the response, never raising so the server keeps going
+def HandleLine(line):
+	start = time.perf_counter()
+	response = {}
+	try:
+		job = json.loads(line)
+		response['id'] = job.get('id')
+		for key in ('input', 'effect', 'output'):
+			if key not in job:
+				raise ValueError(f"missing '{key}'")
+
+		response['output'] = RunJob(job)
+		response['status'] = 'ok'
+	except Exception as e:
+		response['status'] = 'error'
+		response['error'] = str(e)
+
+	response['seconds'] = round(time.perf_counter() - start, 4)
+	return response
+
+#tells whether a line is the bare word quit or a JSON object with "command": "quit", however it is spaced
+def IsQuit(line):
+	if line == 'quit':
+		return True
+
+	try:
+		job = json.loads(line)
+	except ValueError:
+		return False
+
+	return isinstance(job, dict) and job.get('command') == 'quit'
+
+#reads job lines from a text stream and writes one response line per job. Returns False on a quit command.
+def ServeStream(reader, writer):
+	for line in reader:
+		line = line.strip()
+		if not line:
+			continue
+		if IsQuit(line):
+			return False
+
+		writer.write(json.dumps(HandleLine(line)) + "\n")
+		writer.flush()
+
+	return True
+
+#accepts one client at a time on a Unix socket, since the PDB cannot be used from several threads. A client that
+#goes away mid-stream only ends its own connection.
+def ServeSocket(path):
+	if os.path.exists(path):
+		os.unlink(path)
+
+	server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	server.bind(path)
+	server.listen(1)
+	try:
+		running = True
+		while running:
+			connection, _ = server.accept()
+			try:
+				with connection, connection.makefile('r') as reader, connection.makefile('w') as writer:
+					running = ServeStream(reader, writer)
+			except OSError as e:
+				print(f"instagram_server: client dropped: {e}", file=sys.stderr, flush=True)
+	finally:
+		server.close()
+		os.unlink(path)
+
+#sends job lines from a stream to a running server and prints the responses as they arrive. The jobs are written
+#on a thread of their own, so a server blocked writing responses the client has not read yet cannot stall it.
+def Submit(path, lines):
+	client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	client.connect(path)
+	with client, client.makefile('w') as writer, client.makefile('r') as reader:
+		def Send():
+			for line in lines:
+				if line.strip():
+					writer.write(line.strip() + "\n")
+			writer.flush()
+			client.shutdown(socket.SHUT_WR)
+
+		sender = threading.Thread(target=Send, daemon=True)
+		sender.start()
+
+		failed = 0
+		for response in reader:
+			print(response, end="", flush=True)
+			failed += json.loads(response).get('status') != 'ok'
+
+		sender.join()
+
+	return 1 if failed else 0
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Serve Instagram effect jobs from a long-lived GIMP process.")
+	parser.add_argument("--socket", default=defaultSocket, help="path of the Unix socket")
+	parser.add_argument("--stdin", action="store_true", help="read jobs from stdin and answer on stdout")
+	parser.add_argument("--client", action="store_true", help="send jobs from stdin to a running server")
+
+	#inside GIMP sys.argv holds the plug-in protocol arguments, so options come from the environment
+	if argv is None and 'gi.repository.Gimp' in sys.modules:
+		argv = shlex.split(os.environ.get('INSTAGRAM_SERVER_ARGS', ''))
+	args = parser.parse_args(argv)
+
+	if args.client:
+		return Submit(args.socket, sys.stdin)
+	elif args.stdin:
+		ServeStream(sys.stdin, sys.stdout)
+	else:
+		ServeSocket(args.socket)
+
+	return 0
+
+if __name__ == '__main__':
+	status = main()
+	if status:
+		sys.exit(status)
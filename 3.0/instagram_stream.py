@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+'''
+Streaming for the headless Instagram engine, for scans too large to hold in memory. The source is memory-mapped
+from an uncompressed TIFF (with tifffile) or a raw pixel file, each strip of rows is filtered on its own and written
+to a memory-mapped output of the same kind, and the pages of both files are released as each strip is finished.
+Peak memory is therefore set by the strip height and the image width rather than by the image size.
+
+Strips span whole rows. The motion blur runs along rows and so sees all of its samples, and vignettes, gradients
+and masks are generated for each strip from the geometry of the whole image, so strips need no halo rows from
+their neighbours and the result matches a whole image render apart from the noise, which is seeded per strip.
+
+    python3 instagram_stream.py INPUT OUTPUT -e EFFECT [--rows 256] [-j WORKERS] [--shape HEIGHT WIDTH CHANNELS] [--dtype uint8]
+'''
+
+import sys, mmap, time, argparse
+import numpy as np
+import instagram_engine, instagram_lut
+from instagram_engine import Frame
+
+#default strip height in rows
+streamRows = 256
+
+#file types opened with tifffile, anything else is read as raw pixels
+tiffExtensions = ('.tif', '.tiff')
+
+#
+# --- Memory-mapped files ---
+#
+
+#maps the pixels of an uncompressed TIFF, or of a raw file with the given shape and type, read-only
+def OpenSource(path, shape=None, dtype='uint8'):
+	if path.lower().endswith(tiffExtensions):
+		import tifffile
+		return tifffile.memmap(path, mode='r')
+
+	if shape is None:
+		raise ValueError(f"The shape of raw file {path} must be given")
+
+	return np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape))
+
+#creates an output file of the given shape and type and maps its pixels for writing
+def CreateTarget(path, shape, dtype):
+	if path.lower().endswith(tiffExtensions):
+		import tifffile
+		return tifffile.memmap(path, shape=tuple(shape), dtype=dtype, photometric='rgb')
+
+	return np.memmap(path, dtype=dtype, mode='w+', shape=tuple(shape))
+
+#drops the pages holding rows [start, stop) of a mapped array from memory. Written pages must be flushed first.
+#The file keeps its contents, so dropped pages are read back if they are used again.
+def Release(array, start, stop):
+	mapping = getattr(array, '_mmap', None)
+	if mapping is None or not hasattr(mapping, 'madvise'):
+		return
+
+	rowBytes = array.strides[0]
+	base = array.offset % mmap.ALLOCATIONGRANULARITY
+	first = (base + start * rowBytes) // mmap.PAGESIZE * mmap.PAGESIZE
+	last = (base + stop * rowBytes) // mmap.PAGESIZE * mmap.PAGESIZE
+	if last > first:
+		mapping.madvise(mmap.MADV_DONTNEED, first, last - first)
+
+#
+# --- Streaming ---
+#
+
+#applies an effect to a mapped source one strip at a time and writes each strip to a mapped target of the same
+#shape. Each strip is split again into cache sized strips run on a number of threads. With a LUT size the color
+#part is looked up instead, as in instagram_lut.Apply, on one thread.
+def StreamApply(source, target, effect, rows=streamRows, draft=1, lutSize=None, workers=None):
+	if effect not in instagram_engine.effectFunctions:
+		raise ValueError(f"Unknown effect {effect}")
+
+	h, w = source.shape[:2]
+	for y0 in range(0, h, rows):
+		y1 = min(h, y0 + rows)
+		strip = np.asarray(source[y0:y1])
+		frame = Frame(w, h, y0, 1.0, draft)
+		if lutSize:
+			target[y0:y1] = instagram_lut.Apply(strip, effect, lutSize, frame=frame)
+		else:
+			target[y0:y1] = instagram_engine.ApplyParallel(strip, effect, True, frame, workers)
+
+		target.flush()
+		Release(source, y0, y1)
+		Release(target, y0, y1)
+
+	return target
+
+#streams one file into another and returns the seconds taken
+def StreamFile(inpath, outpath, effect, rows=streamRows, shape=None, dtype='uint8', draft=1, lutSize=None, workers=None):
+	source = OpenSource(inpath, shape, dtype)
+	target = CreateTarget(outpath, source.shape, source.dtype)
+
+	start = time.perf_counter()
+	StreamApply(source, target, effect, rows, draft, lutSize, workers)
+	seconds = time.perf_counter() - start
+
+	del source, target
+	return seconds
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Apply an Instagram effect to an image too large for memory, one strip at a time.")
+	parser.add_argument("input", help="uncompressed TIFF, or raw pixel file with --shape")
+	parser.add_argument("output", help="output TIFF or raw file, written with the shape and type of the input")
+	parser.add_argument("-e", "--effect", required=True, choices=list(instagram_engine.effectFunctions), help="effect identifier")
+	parser.add_argument("--rows", type=int, default=streamRows, help="strip height in rows")
+	parser.add_argument("--shape", type=int, nargs=3, metavar=("HEIGHT", "WIDTH", "CHANNELS"), help="shape of a raw input")
+	parser.add_argument("--dtype", default="uint8", choices=["uint8", "uint16", "float32"], help="pixel type of a raw input")
+	parser.add_argument("--draft", type=int, default=1, choices=[1, 4, 8], help="draft factor for the motion blur")
+	parser.add_argument("-j", "--workers", type=int, default=None, help="threads filtering each strip, defaults to the CPU count")
+	parser.add_argument("--lut", type=int, default=None, help="apply the color part through a cached 3D LUT of this size")
+	args = parser.parse_args(argv)
+
+	seconds = StreamFile(args.input, args.output, args.effect, args.rows, args.shape, args.dtype, args.draft, args.lut, args.workers)
+	h, w = OpenSource(args.input, args.shape, args.dtype).shape[:2]
+	print(f"{args.output}: {w}x{h} in {seconds:.2f} s ({w * h / 1e6 / seconds:.1f} MP/s)", file=sys.stderr)
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
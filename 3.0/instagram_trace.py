@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+'''
+Optional per-operation tracing for the Instagram plugin. Set INSTAGRAM_TRACE to 1, or to the path of a .json file,
+before starting GIMP and every traced helper records its wall time and call count for the current effect and image
+size. At the end of a run the events are written as a Chrome trace (open it in chrome://tracing or Perfetto) and a
+one-line summary is printed to stderr. When the variable is not set, Traced returns the helpers unchanged and the
+other functions return at once, so tracing costs nothing and the modules that write the trace are never imported.
+'''
+
+import os, sys, time
+from functools import wraps
+
+setting = os.environ.get('INSTAGRAM_TRACE', '')
+enabled = setting not in ('', '0')
+
+#events recorded for the current run and the run being traced
+events = []
+current = {'name': None, 'w': 0, 'h': 0, 'start': 0.0}
+
+def Now():
+	return time.perf_counter() * 1e6
+
+#records a complete event in Chrome trace format, with times in microseconds
+def Record(name, start, end):
+	import threading
+	events.append({
+		'name': name,
+		'cat': current['name'] or 'instagram',
+		'ph': 'X',
+		'ts': start,
+		'dur': end - start,
+		'pid': os.getpid(),
+		'tid': threading.get_ident(),
+		'args': {'width': current['w'], 'height': current['h']}
+	})
+
+#wraps a helper so each call is recorded. Returns the helper itself when tracing is off.
+def Traced(fn):
+	if not enabled:
+		return fn
+
+	@wraps(fn)
+	def wrapper(*args, **kwargs):
+		start = Now()
+		try:
+			return fn(*args, **kwargs)
+		finally:
+			Record(fn.__name__, start, Now())
+
+	return wrapper
+
+#starts tracing a run of an effect on an image of the given size
+def Begin(name, w, h):
+	if not enabled:
+		return
+
+	events.clear()
+	current.update(name=name, w=int(w), h=int(h), start=Now())
+
+#returns the time and call count of each traced name, slowest first
+def Totals():
+	totals = {}
+	for event in events:
+		seconds, calls = totals.get(event['name'], (0.0, 0))
+		totals[event['name']] = (seconds + event['dur'] / 1e6, calls + 1)
+
+	return sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+
+def TracePath():
+	if setting.endswith('.json'):
+		return setting
+
+	import tempfile
+	return os.path.join(tempfile.gettempdir(), f"instagram-trace-{current['name']}-{os.getpid()}.json")
+
+#finishes the run, writes the Chrome trace and prints the summary line
+def End():
+	if not enabled or current['name'] is None:
+		return
+
+	Record(current['name'], current['start'], Now())
+	total = events[-1]['dur'] / 1e6
+	helpers = [item for item in Totals() if item[0] != current['name']]
+
+	import json
+	path = TracePath()
+	with open(path, 'w') as f:
+		json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+	parts = [f"{name} {calls}x {seconds:.3f}s" for name, (seconds, calls) in helpers]
+	print(f"instagram trace: {current['name']} {current['w']}x{current['h']} {total:.3f}s | " +
+		  " | ".join(parts) + f" | {path}", file=sys.stderr)
+
+	current['name'] = None
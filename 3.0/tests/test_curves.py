@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+'''
+Checks the curve compiler in instagram_curves.py. Each chain is applied once through the lookup tables of
+CurveChain.Compile, the way curves_explicit maps values, and once as the separate passes GIMP would make: the
+sRGB table, the smooth curve and the inverse table for each curve step and the levels mapping for each levels
+step, each read with MapSamples. Known curves and levels are also checked against values worked out by hand
+from the formulas GIMP uses.
+
+    python3 -m pytest tests
+'''
+
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instagram_curves import CurveChain, FastSRGBLuts, MapSamples, SplineSamples, LevelsMap, VALUE, RED, GREEN, BLUE, COLORS
+from instagram_recipes import recipes, Optimize, Curve, Chain
+
+#largest difference allowed between the fused tables and the separate passes, half an 8 bit level
+tolerance = 0.5 / 255
+
+#input values checked, on and between the samples of the compiled tables
+values = [i / 4095 for i in range(4096)]
+
+#the WALDEN color chain as ('curve', channel, points) and ('levels', channel, arguments) steps
+waldenSteps = [
+	('curve', VALUE, [12/255, 0, 1.0, 1.0]),
+	('curve', RED, [10/255, 0, 247/255, 1.0]),
+	('curve', BLUE, [0, 38/255, 1.0, 203/255]),
+	('levels', VALUE, (0, 235/255, True, 1.17, 55/255, 1.0, True)),
+	('curve', VALUE, [41/255, 0, 125/255, 124/255, 1.0, 1.0])
+]
+
+#builds the chain for a list of steps, each curve applied with the sRGB workaround
+def Compile(steps):
+	chain = CurveChain()
+	for kind, channel, args in steps:
+		if kind == 'curve':
+			chain.SRGBSpline(channel, args)
+		else:
+			chain.Levels(channel, *args)
+
+	return dict(chain.Compile())
+
+#maps a value of one color channel through the steps one pass at a time
+def Sequential(steps, channel, value):
+	lin_lut, srgb_lut = FastSRGBLuts()
+	for kind, stepChannel, args in steps:
+		if stepChannel not in (VALUE, channel):
+			continue
+
+		if kind == 'curve':
+			value = MapSamples(lin_lut, value)
+			value = MapSamples(SplineSamples(tuple(args)), value)
+			value = MapSamples(srgb_lut, value)
+		else:
+			value = LevelsMap(value, *args)
+
+	return value
+
+#returns the largest difference between the compiled tables of the steps and the separate passes
+def MaxError(steps):
+	luts = Compile(steps)
+	error = 0.0
+	for channel in COLORS:
+		lut = luts.get(channel, luts.get(VALUE))
+		for value in values:
+			fused = value if lut is None else MapSamples(lut, value)
+			error = max(error, abs(fused - Sequential(steps, channel, value)))
+
+	return error
+
+#encodes and decodes sRGB with the formulas of the standard, written out here rather than read from the tables
+def Encode(x):
+	return x * 12.92 if x < 0.0031308 else 1.055 * x ** (1 / 2.4) - 0.055
+
+def Decode(x):
+	return x / 12.92 if x < 0.04045 else ((x + 0.055) / 1.055) ** 2.4
+
+def test_single_curve():
+	assert MaxError([('curve', RED, [0, 63/255, 100/255, 200/255, 1.0, 1.0])]) < tolerance
+
+def test_walden_chain():
+	assert MaxError(waldenSteps) < tolerance
+
+#a smooth curve through two points is the straight line between them
+def test_straight_curve():
+	luts = dict(CurveChain().Spline(RED, [0, 0.2, 1.0, 0.8]).Compile())
+	for x in (0.0, 0.25, 0.5, 0.8, 1.0):
+		assert abs(MapSamples(luts[RED], x) - (0.2 + 0.6 * x)) < 1e-6
+
+#between the first two of three points, GIMP plots a cubic bezier whose inner control points are set by the slope
+#towards the third point: (0, 0), (1/6, 7/24), (1/3, 7/12) and (1/2, 3/4) here. Halfway, at x = 1/4, it is at
+#3/8 * 7/24 + 3/8 * 7/12 + 1/8 * 3/4 = 27/64.
+def test_curve_through_three_points():
+	luts = dict(CurveChain().Spline(GREEN, [0, 0, 0.5, 0.75, 1.0, 1.0]).Compile())
+	assert abs(MapSamples(luts[GREEN], 0.25) - 27 / 64) < 1e-4
+	assert MapSamples(luts[GREEN], 1.0) == 1.0
+
+#levels stretch the input range, apply the gamma and then fit the output range
+def test_levels():
+	luts = dict(CurveChain().Levels(VALUE, 0.2, 0.6, True, 2.0, 0.1, 0.9, True).Compile())
+	for x, expected in ((0.1, 0.1), (0.3, 0.1 + 0.8 * 0.5), (0.4, 0.1 + 0.8 * 0.5 ** 0.5), (0.7, 0.9)):
+		assert abs(MapSamples(luts[VALUE], x) - expected) < 1e-3
+
+#the sRGB workaround applies a curve to the encoded value and decodes the result
+def test_srgb_curve():
+	luts = dict(CurveChain().SRGBSpline(BLUE, [0, 0.2, 1.0, 0.8]).Compile())
+	for x in (0.05, 0.2, 0.5, 0.9):
+		assert abs(MapSamples(luts[BLUE], x) - Decode(0.2 + 0.6 * Encode(x))) < 1e-3
+
+#a chain that changes all colors alike compiles to a single VALUE table
+def test_shared_table():
+	chain = CurveChain()
+	chain.SRGBSpline(VALUE, [0, 0.1, 1.0, 0.9])
+	chain.Levels(VALUE, 0, 1.0, True, 1.2, 0, 1.0, True)
+	assert [channel for channel, _ in chain.Compile()] == [VALUE]
+
+#a chain that changes one color compiles to a table for that color only
+def test_one_color():
+	chain = CurveChain()
+	chain.SRGBSpline(GREEN, [0, 0.1, 1.0, 0.9])
+	assert [channel for channel, _ in chain.Compile()] == [GREEN]
+
+#every chain the optimizer builds for the effects, at the precisions of 8 bit and 16 bit images
+def test_recipe_chains():
+	chains = [step for levels in (255, 65535) for recipe in recipes.values()
+			  for step in Optimize(recipe, levels) if isinstance(step, Chain)]
+	assert chains
+	for chain in chains:
+		steps = [('curve', step.channel, step.points) if isinstance(step, Curve) else ('levels', step.channel, tuple(step[2:]))
+				 for step in chain.steps]
+		assert MaxError(steps) < tolerance, chain
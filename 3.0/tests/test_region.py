@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+'''
+Checks that an effect built in the bounds of a selection draws what it would draw on an image the size of those
+bounds, on layers placed at their offset. The plugin is run against the stand-in gi modules of the benchmarks,
+which record the endpoints of every gradient together with the offsets of the layer it is drawn on.
+
+    python3 -m pytest tests
+'''
+
+import os, sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import standin_gi
+standin_gi.Install()
+
+import pytest
+import instagram_plugin
+from standin_gi import recorder, Gimp, Config, Procedure
+
+#size of the image and the selection bounds in it as (x, y, w, h), away from the origin
+imageSize = (1200, 800)
+region = (300, 200, 600, 400)
+
+#runs an effect on a new image, in the given bounds if any, and returns the gradients drawn
+def Gradients(effect, w, h, bounds=None):
+	image = Gimp.Image(w, h)
+	drawable = Gimp.Layer(image, w, h, 'Background')
+	image.insert_layer(drawable, None, 0)
+	if bounds is not None:
+		x, y, sw, sh = bounds
+		image.selection = standin_gi.Bounds(True, x, y, x + sw, y + sh)
+
+	recorder.Reset(w, h)
+	config = Config({'effect': effect, 'strength': 100.0, 'output': 'LAYERS', 'quality': 'FULL', 'selection-only': bounds is not None})
+	instagram_plugin.Instagram().run(Procedure(), Gimp.RunMode.NONINTERACTIVE, image, [drawable], config, None)
+
+	return recorder.gradients
+
+@pytest.mark.parametrize('effect', [identifier for identifier, _ in instagram_plugin.effectsList])
+def test_selection_gradients(effect):
+	x, y, w, h = region
+	expected = [(name, x, y, *ends) for name, _, _, *ends in Gradients(effect, w, h)]
+	assert Gradients(effect, *imageSize, region) == expected
+
+#the check above only means something if some effects draw gradients
+def test_effects_draw_gradients():
+	assert any(Gradients(effect, *imageSize) for effect, _ in instagram_plugin.effectsList)